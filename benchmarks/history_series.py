@@ -0,0 +1,47 @@
+"""
+Compares the old history statistics path (a record per bucket, a {'x': str(x), 'y': y} dict per bucket,
+a Python loop for the cumulative total) with common.series (the query_np result, vectorized and encoded
+straight to JSON).
+
+    python benchmarks/history_series.py
+"""
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from common.records import make_records  # noqa: E402
+from common.serialization import dumps  # noqa: E402
+from common.series import Series  # noqa: E402
+
+BUCKETS = 24 * 365
+X = [datetime(2023, 1, 1) + timedelta(hours=index) for index in range(BUCKETS)]
+Y = [index % 500 for index in range(BUCKETS)]
+RESULT_ROWS = list(zip(X, Y))
+# what clickhouse_connect's query_np returns for a DateTime x and a UInt64 y
+RESULT_ARRAY = np.array(RESULT_ROWS, dtype=[('x', 'datetime64[s]'), ('y', 'uint64')])
+
+
+def old_total_accounts():
+    new_accounts = [{'x': str(item.x), 'y': item.y} for item in make_records(['x', 'y'], RESULT_ROWS)]
+    result = []
+    for item in new_accounts:
+        amount_to_add = result[-1]['y'] if len(result) else 1000
+        result.append({'x': item['x'], 'y': item['y'] + amount_to_add})
+    return dumps({'data': result})
+
+
+def series_total_accounts():
+    new_accounts = Series.from_array(RESULT_ARRAY)
+    return dumps({'data': Series(new_accounts.x, 1000 + np.cumsum(new_accounts.y))})
+
+
+if __name__ == '__main__':
+    assert old_total_accounts() == series_total_accounts()
+    for builder in (old_total_accounts, series_total_accounts):
+        seconds = min(timeit.repeat(builder, number=5, repeat=5)) / 5
+        print(f'{builder.__name__:<22} {seconds * 1000:8.2f} ms')
@@ -0,0 +1,93 @@
+"""
+Compares the old response pipeline (jsonify, decode and re-encode in add_address_to_response,
+decode and re-encode in the after_request hook) with common.serialization (one orjson encode and
+the envelope spliced into the bytes).
+
+    python benchmarks/json_serialization.py
+"""
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from common.serialization import dumps, add_fields  # noqa: E402
+
+ENVELOPE = {'network': 'cosmos', 'response_time': 12}
+
+
+def rich_list_payload(rows: int = 1000) -> dict:
+    return {'data': [{
+        'address': f'cosmos1{index:038d}',
+        'sum': 10 ** 12 + index * 7919,
+        'total_supply_ratio': index / 3e9,
+    } for index in range(rows)], 'name': 'rich_list'}
+
+
+def validators_payload(rows: int = 200) -> dict:
+    return {'validators': [{
+        'operator_address': f'cosmosvaloper1{index:038d}',
+        'moniker': f'validator {index}',
+        'consensus_address': f'cosmosvalcons1{index:038d}',
+        'self_delegate_address': f'cosmos1{index:038d}',
+        'website': 'https://example.com',
+        'details': 'Secure and reliable validator ' * 4,
+        'commission': Decimal('0.05'),
+        'max_rate': 0.2,
+        'max_change_rate': 0.01,
+        'voting_power': 10 ** 11 + index,
+        'voting_power_percent': index / 200,
+        'cumulative_share': index / 2,
+        'self_delegations': 10 ** 9,
+        'delegators': 1000 + index,
+        'delegators_change': index - 100,
+        'is_active': index < 180,
+        'jailed': False,
+        'votes': index % 50,
+        'slashing_events': 0,
+        'height': 19000000 + index,
+        'timestamp': datetime(2024, 1, 1) + timedelta(minutes=index),
+        'avatar_url': f'https://example.com/{index}.png',
+    } for index in range(rows)]}
+
+
+def flask_default(value):
+    if isinstance(value, datetime):
+        from werkzeug.http import http_date
+        return http_date(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError
+
+
+def old_pipeline(payload: dict, address: bool) -> bytes:
+    body = json.dumps(payload, default=flask_default, sort_keys=True, separators=(',', ':')) + '\n'
+    if address:
+        data = json.loads(body)
+        data['address'] = 'cosmos1'
+        body = json.dumps(data)
+    data = json.loads(body)
+    data.update(ENVELOPE)
+    return json.dumps(data).encode()
+
+
+def new_pipeline(payload: dict, address: bool) -> bytes:
+    if address:
+        payload['address'] = 'cosmos1'
+    return add_fields(dumps(payload), ENVELOPE)
+
+
+def measure(name: str, payload: dict, address: bool, number: int = 50):
+    for pipeline in (old_pipeline, new_pipeline):
+        size = len(pipeline(payload, address))
+        seconds = min(timeit.repeat(lambda: pipeline(payload, address), number=number, repeat=5)) / number
+        print(f'{name:<12} {pipeline.__name__:<13} {seconds * 1000:8.2f} ms  {size / seconds / 2 ** 20:8.1f} MiB/s  {size} bytes')
+
+
+if __name__ == '__main__':
+    measure('rich_list', rich_list_payload(), address=False)
+    measure('validators', validators_payload(), address=False)
+    measure('account', validators_payload(50), address=True)
@@ -0,0 +1,35 @@
+"""
+Compares building query results the old way (a new namedtuple class per query, Record(*row) per row)
+with common.records (record class cached by columns, Record._make per row).
+
+    python benchmarks/record_classes.py
+"""
+import os
+import sys
+import timeit
+from collections import namedtuple
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from common.records import fix_column_names, make_records  # noqa: E402
+
+ROWS = 100_000
+COLUMN_NAMES = ['height', 'address', 'tx_hash', 'amount', 'sum(amount)', 'timestamp']
+RESULT_ROWS = [(index, f'cosmos1{index:038d}', f'{index:064x}', index * 1000, float(index), datetime(2024, 1, 1))
+               for index in range(ROWS)]
+
+
+def old_make_query():
+    Record = namedtuple('Record', fix_column_names(COLUMN_NAMES))
+    return [Record(*item) for item in RESULT_ROWS]
+
+
+def cached_records():
+    return make_records(COLUMN_NAMES, RESULT_ROWS)
+
+
+if __name__ == '__main__':
+    for builder in (old_make_query, cached_records):
+        seconds = min(timeit.repeat(builder, number=5, repeat=5)) / 5
+        print(f'{builder.__name__:<16} {seconds * 1000:8.2f} ms  {ROWS / seconds:16,.0f} rows/s')
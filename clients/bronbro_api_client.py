@@ -1,11 +1,11 @@
 import asyncio
 
 import aiohttp
-import requests
 
 from common.constants import OSMO_LOGO_URL
 from common.decorators import response_decorator
-from config.config import LCD_API, PRICE_FEED_API
+from common.http_connector import HttpConnector
+from config.settings import LCD_API, PRICE_FEED_API
 from typing import Optional, Tuple, List
 from urllib.parse import urljoin
 
@@ -15,16 +15,20 @@ class BronbroApiClient:
     def __init__(self):
         self.lcd_api_url = LCD_API
         self.price_feed_api_url = PRICE_FEED_API
+        self.http_connector = HttpConnector()
+
+    def run(self, coroutine):
+        return self.http_connector.run(coroutine)
 
     @response_decorator
     def lcd_get(self, url):
         url = urljoin(self.lcd_api_url, url)
-        return requests.get(url)
+        return self.http_connector.get(url)
 
     @response_decorator
     def rpc_get(self, url):
         url = urljoin(self.price_feed_api_url, url)
-        return requests.get(url)
+        return self.http_connector.get(url)
 
     def get_address_rewards(self, address: str) -> Optional[dict]:
         return self.lcd_get(f'/cosmos/distribution/v1beta1/delegators/{address}/rewards')
@@ -35,55 +39,53 @@ class BronbroApiClient:
     def get_exchange_rates(self) -> List[dict]:
         return self.rpc_get('price_feed_api/tokens/')
 
-    def get_token_logo(self, token: str) -> dict:
-        return self.rpc_get(f'skychart/v1/asset/{token}')
-
     def get_slash_params(self) -> dict:
         return self.lcd_get(f'cosmos/slashing/v1beta1/params')
 
     async def get_symbol_from_denom(self, session, denom: str) -> dict:
         url = urljoin(self.lcd_api_url, f'ibc/apps/transfer/v1/denom_traces/{denom.split("/")[1]}')
-        async with session.get(url) as resp:
-            response = await resp.json()
-            return {
-                'denom': denom,
-                'symbol': response.get('denom_trace').get('base_denom')
-            }
+        try:
+            async with session.get(url) as resp:
+                response = await resp.json() if resp.ok else {}
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            # an unreachable LCD resolves nothing, the None symbol is cached for ASSET_CACHE_NEGATIVE_TTL
+            response = {}
+        return {
+            'denom': denom,
+            'symbol': (response.get('denom_trace') or {}).get('base_denom')
+        }
 
     async def get_logo_for_symbol(self, session, symbol: str) -> dict:
         url = urljoin(self.price_feed_api_url, f'skychart/v1/asset/{symbol}')
-        async with session.get(url) as resp:
-            response = resp
-            if response.status < 300 and response.status >= 200:
-                response_json = await response.json()
-                logo = response_json.get('logo_URIs', {}).get('svg', '') if resp.ok else ''
-                if not logo and symbol == 'osmo':
-                    logo = OSMO_LOGO_URL
-                return {
-                    'symbol': symbol,
-                    'logo': logo
-                }
-            else:
-                return {
-                    'symbol': '',
-                    'logo': ''
-                }
+        try:
+            async with session.get(url) as resp:
+                response_json = await resp.json() if resp.ok else {}
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            # served without a logo, the empty one is cached for ASSET_CACHE_NEGATIVE_TTL
+            response_json = {}
+        logo = (response_json.get('logo_URIs') or {}).get('svg', '')
+        if not logo and symbol == 'osmo':
+            logo = OSMO_LOGO_URL
+        return {
+            'symbol': symbol,
+            'logo': logo
+        }
 
     async def get_symbols_from_denoms(self, denoms: List[str]):
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for denom in denoms:
-                tasks.append(asyncio.ensure_future(self.get_symbol_from_denom(session, denom)))
+        session = self.http_connector.async_session
+        tasks = []
+        for denom in denoms:
+            tasks.append(asyncio.ensure_future(self.get_symbol_from_denom(session, denom)))
 
-            return await asyncio.gather(*tasks)
+        return await asyncio.gather(*tasks)
 
     async def get_symbols_logos(self, symbols: List[str]):
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for symbol in symbols:
-                tasks.append(asyncio.ensure_future(self.get_logo_for_symbol(session, symbol)))
+        session = self.http_connector.async_session
+        tasks = []
+        for symbol in symbols:
+            tasks.append(asyncio.ensure_future(self.get_logo_for_symbol(session, symbol)))
 
-            return await asyncio.gather(*tasks)
+        return await asyncio.gather(*tasks)
 
     async def get_balance_item(self, session, item_info: dict) -> dict:
         async with session.get(item_info.get('endpoint')) as resp:
@@ -112,8 +114,8 @@ class BronbroApiClient:
                 "type": "rewards"
             }
         ]
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for balance_item in balance_items_to_receive:
-                tasks.append(asyncio.ensure_future(self.get_balance_item(session, balance_item)))
-            return await asyncio.gather(*tasks)
+        session = self.http_connector.async_session
+        tasks = []
+        for balance_item in balance_items_to_receive:
+            tasks.append(asyncio.ensure_future(self.get_balance_item(session, balance_item)))
+        return await asyncio.gather(*tasks)
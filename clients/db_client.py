@@ -1,13 +1,14 @@
 from datetime import timedelta, datetime
-from typing import Optional, List
-
-import clickhouse_connect
+from typing import Optional, List, Iterator
 
+from common.concurrency import query_settings
 from common.constants import BRONBRO_OPERATOR_ADDRESS
 from common.db_connector import DBConnector
 from common.decorators import get_first_if_exists
-from config.config import CLICKHOUSE_HOST, CLICKHOUSE_PORT, CLICKHOUSE_USERNAME, CLICKHOUSE_PASSWORD, STAKED_DENOM
-from collections import namedtuple
+from common.pagination import Keyset, sql_literal
+from common.records import make_records
+from common.series import Series
+from config.settings import STAKED_DENOM
 
 from services.sql_filter_builder import SqlFilterBuilderService
 
@@ -15,38 +16,57 @@ from services.sql_filter_builder import SqlFilterBuilderService
 class DBClient:
 
     def __init__(self):
-        self.connection = DBConnector().clickhouse_client
+        self.db_connector = DBConnector()
         self.sql_filter_builder = SqlFilterBuilderService()
 
-    def fix_column_names(self, column_names: List[str]) -> List[str]:
-        res = []
-        for column_name in column_names:
-            new_column_name = column_name.replace('(', '_').replace(')', '_').replace('.', '_')
-            res.append(new_column_name)
-        return res
+    def make_query(self, query: str, raw: bool = False, stream: bool = False):
+        """
+        Runs a query and returns its rows as namedtuples, or with `raw` a NumPy record array read column
+        by column (result['x'] is the whole column, no object per row) for results consumed as columns,
+        or with `stream` the rows block by block (see make_stream_query).
+        """
+        if stream:
+            return self.make_stream_query(query)
+        with self.db_connector.connection() as connection:
+            if raw:
+                return connection.query_np(query, settings=query_settings())
+            query = connection.query(query, settings=query_settings())
+        return make_records(query.column_names, query.result_rows)
+
+    def make_stream_query(self, query: str) -> Iterator[List[tuple]]:
+        """
+        Generator of the query's rows, a list of namedtuples per block as ClickHouse sends them, so the
+        whole result is never in memory. Nothing runs until the first block is asked for, from then on
+        a pooled connection is held until the last block is read or the generator is closed.
+        """
+        with self.db_connector.connection() as connection:
+            with connection.query_row_block_stream(query, settings=query_settings()) as blocks:
+                for block in blocks:
+                    yield make_records(blocks.source.column_names, block)
 
-    def make_query(self, query: str) -> List[namedtuple]:
-        query = self.connection.query(query)
-        Record = namedtuple("Record", self.fix_column_names(query.column_names))
-        result = [Record(*item) for item in query.result_rows]
-        return result
+    def make_series_query(self, query: str) -> Series:
+        """
+        Runs a history statistics query, a row per bucket with columns x and y, in raw mode so the
+        result goes straight into NumPy arrays.
+        """
+        return Series.from_array(self.make_query(query, raw=True))
 
     @get_first_if_exists
-    def get_account_balance(self, address: str) -> Optional[namedtuple]:
+    def get_account_balance(self, address: str) -> Optional[tuple]:
         return self.make_query(f'''
             SELECT address, coins FROM spacebox.account_balance FINAL
             WHERE address = '{address}'
             LIMIT 1
         ''')
 
-    def get_stacked_balance_for_address(self, address: str) -> namedtuple:
+    def get_stacked_balance_for_address(self, address: str) -> tuple:
         return self.make_query(f'''
             SELECT sum(JSONExtractInt(coin, 'amount')) as amount, JSONExtractString(coin, 'denom') as denom FROM spacebox.delegation FINAL
             WHERE delegator_address = '{address}' and JSONExtractInt(coin, 'amount') > 0
             GROUP BY denom
         ''')
 
-    def get_unbonding_balance_for_address(self, address: str) -> namedtuple:
+    def get_unbonding_balance_for_address(self, address: str) -> tuple:
         return self.make_query(f'''
             SELECT sum(coin.amount), coin.denom FROM spacebox.unbonding_delegation FINAL
             WHERE delegator_address = '{address}'
@@ -55,22 +75,14 @@ class DBClient:
         ''')
 
     @get_first_if_exists
-    def get_distribution_params(self) -> Optional[namedtuple]:
+    def get_distribution_params(self) -> Optional[tuple]:
         return self.make_query(f'''
         select * from spacebox.distribution_params final
         order by height desc
         limit 1
     ''')
 
-    @get_first_if_exists
-    def get_staking_pool(self) -> Optional[namedtuple]:
-        return self.make_query(f'''
-        select * from spacebox.staking_pool final
-        order by height desc
-        limit 1
-    ''')
-
-    def get_validators(self, address: str) -> List[namedtuple]:
+    def get_validators(self, address: str) -> List[tuple]:
         return self.make_query(f'''
         SELECT 
             t.operator_address as operator_address,
@@ -96,12 +108,15 @@ class DBClient:
         ) AS c ON _t.operator_address = c.operator_address 
     ''')
 
-    def get_proposals(self, limit, offset, query_params) -> List[namedtuple]:
+    def get_proposals(self, limit, offset, query_params, stream=False, cursor=None) -> List[tuple]:
+        keyset = Keyset(('id', 'DESC'))
+        after = keyset.decode(cursor)
         if not limit:
             limit = 10
-        if not offset:
+        if not offset or after:
             offset = 0
         filter_string = self.sql_filter_builder.build_filter(query_params)
+        filter_string += keyset.filter(after, ' AND' if filter_string else 'WHERE')
         return self.make_query(f'''
             SELECT 
                 id,
@@ -177,12 +192,12 @@ class DBClient:
             ( SELECT proposal_id, proposer
             FROM spacebox.submit_proposal_message FINAL) AS spm ON _t.id = spm.proposal_id
             WHERE deposit > 999999
-            ORDER BY id DESC
+            ORDER BY {keyset.order_by()}
                         LIMIT {limit} OFFSET {offset}
-        ''')
+        ''', stream=stream)
 
     @get_first_if_exists
-    def get_proposal(self, id: int) -> Optional[namedtuple]:
+    def get_proposal(self, id: int) -> Optional[tuple]:
         return self.make_query(f'''
             SELECT 
                 id,
@@ -257,7 +272,7 @@ class DBClient:
             WHERE id = {id}
         ''')
 
-    def get_proposals_deposits(self, ids: List[str]) -> List[namedtuple]:
+    def get_proposals_deposits(self, ids: List[str]) -> List[tuple]:
 
         return self.make_query(f"""
             SELECT
@@ -288,28 +303,36 @@ class DBClient:
                 spacebox.proposal_vote_message 
         """)
 
-    def get_proposals_ids_with_votes(self, limit, offset, order_by) -> List[namedtuple]:
+    def get_proposals_ids_with_votes(self, limit, offset, order_by, cursor=None) -> List[tuple]:
         if not limit:
             limit = 10
-        if not offset:
-            offset = 0
         if not order_by:
             order_by = 'ASC'
+        keyset = Keyset(('proposal_id', order_by))
+        after = keyset.decode(cursor)
+        if not offset or after:
+            offset = 0
         return self.make_query(f'''
             SELECT 
                 DISTINCT 
                     proposal_id 
             FROM 
                 spacebox.proposal_vote_message 
-            ORDER BY proposal_id {order_by}
+            {keyset.filter(after, 'WHERE')}
+            ORDER BY {keyset.order_by()}
             LIMIT {limit} 
             OFFSET {offset}
         ''')
 
-    def get_amount_votes(self, proposals_ids) -> List[namedtuple]:
+    def get_amount_votes(self, proposals_ids) -> List[tuple]:
+        # one row per proposal with the number of voters per option
         return self.make_query(f'''
             SELECT 
-                option, proposal_id, count(*) 
+                proposal_id,
+                countIf(option = 'VOTE_OPTION_YES') AS yes,
+                countIf(option = 'VOTE_OPTION_NO') AS no,
+                countIf(option = 'VOTE_OPTION_ABSTAIN') AS abstain,
+                countIf(option = 'VOTE_OPTION_NO_WITH_VETO') AS no_with_veto
             FROM (
                 SELECT 
                     * 
@@ -322,18 +345,20 @@ class DBClient:
                 ) AS _t
                 WHERE rank = 1
             ) AS t
-            GROUP BY option, proposal_id
+            GROUP BY proposal_id
         ''')
 
-    def get_shares_votes(self, proposals_ids) -> List[namedtuple]:
+    def get_shares_votes(self, proposals_ids) -> List[tuple]:
+        # latest tally of every proposal
         return self.make_query(f'''
             SELECT * 
             FROM spacebox.proposal_tally_result 
             WHERE proposal_id IN ({','.join(proposals_ids)})
             ORDER BY height desc
+            LIMIT 1 BY proposal_id
         ''')
 
-    def get_amount_votes_for_proposal(self, proposal_id) -> List[namedtuple]:
+    def get_amount_votes_for_proposal(self, proposal_id) -> List[tuple]:
         return self.make_query(f'''
             SELECT option, count(*) FROM (
                 SELECT * FROM (
@@ -348,7 +373,7 @@ class DBClient:
         ''')
 
     @get_first_if_exists
-    def get_shares_votes_for_proposal(self, proposal_id) -> namedtuple:
+    def get_shares_votes_for_proposal(self, proposal_id) -> tuple:
         return self.make_query(f'''
             SELECT * 
             FROM spacebox.proposal_tally_result 
@@ -412,10 +437,17 @@ class DBClient:
             ORDER  BY operator_address 
         """)
 
-    def get_validators_proposal_votes_with_additional_info(self, proposal_id, validator_address=None):
+    def get_validators_proposal_votes_with_additional_info(self, proposal_id, validator_address=None, validator_option=None):
         validator_filter = ''
         if validator_address:
             validator_filter = f"AND operator_address = '{validator_address}'"
+        option_filter = ''
+        if validator_option == 'WEIGHTED_VOTE':
+            # weighted votes are stored as a JSON list of options
+            option_filter = """AND pvm.option != '' AND pvm.option NOT IN (
+                'VOTE_OPTION_YES', 'VOTE_OPTION_NO', 'VOTE_OPTION_ABSTAIN', 'VOTE_OPTION_NO_WITH_VETO')"""
+        elif validator_option:
+            option_filter = f"AND pvm.option = '{validator_option}'"
         return self.make_query(f"""
             SELECT
                 _t.operator_address AS operator_address,
@@ -466,10 +498,11 @@ class DBClient:
             where
                 pvm.rank in (0,1)
                 {validator_filter}
+                {option_filter}
                 ORDER BY voting_power_rank
         """)
 
-    def get_validators_delegations(self) -> namedtuple:
+    def get_validators_delegations(self) -> tuple:
         return self.make_query(f"""
             SELECT DISTINCT on (delegator_address, operator_address) * from spacebox.delegation WHERE delegator_address  in (
             SELECT self_delegate_address from spacebox.validator_info vi 
@@ -477,13 +510,13 @@ class DBClient:
         """)
 
     @get_first_if_exists
-    def get_validator_self_delegation(self, operator_address, self_delegate_address) -> namedtuple:
+    def get_validator_self_delegation(self, operator_address, self_delegate_address) -> tuple:
         return self.make_query(f"""
             SELECT * from spacebox.delegation WHERE JSONExtractInt(coin, 'amount') > 0 and delegator_address = '{self_delegate_address}' and operator_address = '{operator_address}' order by height DESC
         """)
 
     @get_first_if_exists
-    def get_validator_info(self, validator_address) -> namedtuple:
+    def get_validator_info(self, validator_address) -> tuple:
         return self.make_query(f"""
             SELECT
                 _t.operator_address AS operator_address,
@@ -561,7 +594,7 @@ class DBClient:
         """)
 
     @get_first_if_exists
-    def get_address_votes_amount(self, voter_address) -> namedtuple:
+    def get_address_votes_amount(self, voter_address) -> tuple:
         return self.make_query(f"""
             SELECT COUNT(DISTINCT proposal_id) 
             FROM spacebox.proposal_vote_message pvm 
@@ -569,7 +602,7 @@ class DBClient:
         """)
 
     @get_first_if_exists
-    def get_staking_pool(self) -> namedtuple:
+    def get_staking_pool(self) -> tuple:
         return self.make_query(f"""
             SELECT bonded_tokens as bonded_tokens FROM spacebox.staking_pool FINAL
             WHERE height = (SELECT max(height) FROM spacebox.staking_pool FINAL)
@@ -581,24 +614,33 @@ class DBClient:
                 SELECT JSONExtractInt(params, '{parameter}') as value FROM spacebox.distribution_params FINAL ORDER BY height DESC limit 1
             """)
     @get_first_if_exists
-    def get_count_of_active_proposals(self) -> namedtuple:
+    def get_count_of_active_proposals(self) -> tuple:
         return self.make_query("""
             SELECT COUNT(*) FROM spacebox.proposal FINAL WHERE status = 'PROPOSAL_STATUS_VOTING_PERIOD'
         """)
 
     @get_first_if_exists
-    def get_count_of_pending_proposals(self) -> namedtuple:
+    def get_count_of_pending_proposals(self) -> tuple:
         return self.make_query("""
             SELECT COUNT(*) FROM spacebox.proposal FINAL WHERE status IN ('PROPOSAL_STATUS_VOTING_PERIOD', 'PROPOSAL_STATUS_DEPOSIT_PERIOD')
         """)
 
     @get_first_if_exists
-    def get_last_block_height(self) -> namedtuple:
+    def get_last_block_height(self) -> tuple:
         return self.make_query("""
             SELECT MAX(height) FROM spacebox.block FINAL
         """)
 
-    def get_blocks_lifetime(self) -> List[namedtuple]:
+    @get_first_if_exists
+    def get_head_block(self) -> Optional[tuple]:
+        # runs every HEIGHT_PROBE_INTERVAL in every worker, reading in the sorting key order only touches
+        # the last granule where max(timestamp) would scan the whole column. No FINAL, a duplicated head
+        # block row has the same values
+        return self.make_query("""
+            SELECT height, timestamp FROM spacebox.block ORDER BY height DESC LIMIT 1
+        """)
+
+    def get_blocks_lifetime(self) -> List[tuple]:
         return self.make_query("""
         select 
           t1.height as x, 
@@ -616,14 +658,17 @@ class DBClient:
         LIMIT 1000 OFFSET 1
         """)
 
-    def get_transactions_per_block(self, limit, offset):
+    def get_transactions_per_block(self, limit, offset, stream=False, cursor=None):
+        keyset = Keyset(('height', 'DESC'))
+        after = keyset.decode(cursor)
         if not limit:
             limit = 10
-        if not offset:
+        if not offset or after:
             offset = 0
         return self.make_query(f"""
-            SELECT height, timestamp, num_txs, total_gas FROM spacebox.block b FINAL ORDER BY height DESC LIMIT {limit} OFFSET {offset}
-        """)
+            SELECT height, timestamp, num_txs, total_gas FROM spacebox.block b FINAL {keyset.filter(after, 'WHERE')}
+            ORDER BY {keyset.order_by()} LIMIT {limit} OFFSET {offset}
+        """, stream=stream)
 
     @get_first_if_exists
     def get_actual_staking_param(self, parameter):
@@ -751,7 +796,7 @@ class DBClient:
         """)
 
     def get_circulating_supply_by_days(self, from_date, to_date, detailing, height_from=None, height_to=None):
-        return self.make_query(f"""
+        return self.make_series_query(f"""
             select {detailing}(u.hh) as x, avg(JSONExtractFloat(coin, 'amount')) as y from
             (
                 select arrayJoin(JSONExtractArrayRaw(JSONExtractString(coins))) as coin, height 
@@ -1314,7 +1359,7 @@ class DBClient:
         """
 
     def get_validator_commissions(self, from_date, to_date, grouping_function, operator_address, height_from, height_to):
-        return self.make_query(f"""
+        return self.make_series_query(f"""
             SELECT {grouping_function}(timestamp) AS x, sum(JSONExtractFloat(amount, 'amount')) AS y 
             from (
             select * FROM spacebox.distribution_commission FINAL where height between {height_from} and {height_to} and operator_address = '{operator_address}' and JSONExtractString(amount, 'denom') = 'uatom'
@@ -1327,7 +1372,7 @@ class DBClient:
         """)
 
     def get_validator_rewards(self, from_date, to_date, grouping_function, operator_address, height_from, height_to):
-        return self.make_query(f"""
+        return self.make_series_query(f"""
             SELECT {grouping_function}(timestamp) AS x, sum(JSONExtractFloat(amount, 'amount')) AS y 
             from (
             select * FROM spacebox.distribution_reward FINAL where height between {height_from} and {height_to} and operator_address = '{operator_address}' and JSONExtractString(amount, 'denom') = 'uatom'
@@ -1340,7 +1385,7 @@ class DBClient:
         """)
 
     def get_validator_voting_power_history(self, from_date, to_date, grouping_function, operator_address, height_from, height_to):
-        return self.make_query(f"""
+        return self.make_series_query(f"""
             SELECT {grouping_function}(timestamp) AS x, median(voting_power) AS y 
             from (
             select * FROM spacebox.validator_voting_power FINAL where height between {height_from} and {height_to} and validator_address = '{operator_address}'
@@ -1376,7 +1421,7 @@ class DBClient:
         """)
 
     def get_validator_historical_uptime_stat(self, from_date, to_date, grouping_function, validator_address, height_from, height_to):
-        return self.make_query(f"""
+        return self.make_series_query(f"""
             SELECT {grouping_function}(timestamp) AS x, count(*) AS y 
             from (
             select DISTINCT ON (height, validator_address) * from spacebox.validator_precommit FINAL 
@@ -1388,7 +1433,7 @@ class DBClient:
         """)
 
     def get_total_count_of_blocks_for_historical_uptime_stat(self, from_date, to_date, grouping_function, height_from, height_to):
-        return self.make_query(f"""
+        return self.make_series_query(f"""
             SELECT {grouping_function}(timestamp) AS x, count(*) AS y 
             from (
             select DISTINCT ON (height) * from spacebox.validator_precommit FINAL 
@@ -1490,10 +1535,14 @@ class DBClient:
                 select count(*) as value from spacebox.exec_message FINAL WHERE height > {height_from}
             """)
 
-    def get_whale_transactions(self, limit, offset, height_from):
+    def get_whale_transactions(self, limit, offset, height_from, stream=False, cursor=None):
+        # amount separates the messages of a transaction from the same address, rows equal in all four
+        # columns are the same transfer repeated and a page ending among them skips the rest
+        keyset = Keyset(('txs.height', 'DESC'), ('txs.tx_hash', 'ASC'), ('txs.address', 'ASC'), ('txs.amount', 'ASC'))
+        after = keyset.decode(cursor)
         if not limit:
             limit = 10
-        if not offset:
+        if not offset or after:
             offset = 0
         return self.make_query(f"""
             Select 
@@ -1529,19 +1578,25 @@ class DBClient:
                 SELECT height, JSONExtractString(data, 'receiver') as address, tx_hash, toUInt128(JSONExtractString(data, 'amount')) AS amount FROM spacebox.receive_packet_message
                 WHERE source_port = 'transfer' AND JSONExtractString(data, 'denom') LIKE '%uatom%'
             )
-            WHERE height >= {height_from}
+            WHERE height >= {height_from} {f'AND height <= {sql_literal(after[0])}' if after else ''}
             order by height DESC
             ) AS txs
             LEFT JOIN (SELECT height, toUInt128(not_bonded_tokens) + toInt128(bonded_tokens) AS supply FROM spacebox.staking_pool sp ) AS supply ON txs.height = supply.height
             LEFT JOIN (SELECT * FROM spacebox.block ) AS block ON block.height = supply.height
-            WHERE supply <> 0 and amount/supply >= 0.0001
+            WHERE supply <> 0 and amount/supply >= 0.0001 {keyset.filter(after, 'AND')}
+            ORDER BY {keyset.order_by()}
             LIMIT {limit} OFFSET {offset}
-        """)
+        """, stream=stream)
 
-    def get_whale_transaction_details(self, tx_hashes):
+    def get_whale_transaction_details(self, tx_hashes, height_from, height_to):
+        # one message per transaction, which one is unspecified, as a tuple so details and type come from the same row
         return self.make_query(f"""
-            SELECT value as details, type, transaction_hash as tx_hash from spacebox.message 
-            where transaction_hash IN ('{"','".join(tx_hashes)}')
+            SELECT tx_hash, tupleElement(message, 1) AS details, tupleElement(message, 2) AS type FROM (
+                SELECT transaction_hash AS tx_hash, any((value, type)) AS message FROM spacebox.message
+                WHERE height BETWEEN {height_from} AND {height_to}
+                    AND transaction_hash IN ({', '.join(map(sql_literal, tx_hashes))})
+                GROUP BY transaction_hash
+            )
         """)
 
     def get_wealth_distribution(self):
@@ -1592,10 +1647,13 @@ class DBClient:
             ORDER BY gap
         """)
 
-    def get_rich_list(self, limit, offset):
+    def get_rich_list(self, limit, offset, stream=False, cursor=None):
+        # address breaks ties between equal balances, a cursor needs a unique order
+        keyset = Keyset(('sum', 'DESC'), ('address', 'ASC'))
+        after = keyset.decode(cursor)
         if not limit:
             limit = 1000
-        if not offset:
+        if not offset or after:
             offset = 0
         return self.make_query(f"""
             SELECT
@@ -1652,7 +1710,7 @@ class DBClient:
                     liquid.address = unbonded.address
             ) AS _result
                 LEFT JOIN (SELECT address, type FROM spacebox.account GROUP BY address, type) as _type ON liquid.address = _type.address
-            where type <> '/cosmos.auth.v1beta1.ModuleAccount'
-            ORDER BY sum DESC
+            where type <> '/cosmos.auth.v1beta1.ModuleAccount' {keyset.filter(after, 'AND')}
+            ORDER BY {keyset.order_by()}
             LIMIT {limit} OFFSET {offset}
-        """)
+        """, stream=stream)
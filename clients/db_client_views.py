@@ -1,30 +1,30 @@
 from datetime import datetime, timedelta
-from typing import List
+from common.concurrency import query_settings
 from common.db_connector import DBConnector
-from collections import namedtuple
 
 from common.decorators import get_first_if_exists
+from common.records import make_records
+from common.series import Series
 from services.sql_filter_builder import SqlFilterBuilderService
 
 
 class DBClientViews:
 
     def __init__(self):
-        self.connection = DBConnector().clickhouse_client
+        self.db_connector = DBConnector()
         self.sql_filter_builder = SqlFilterBuilderService()
 
-    def fix_column_names(self, column_names: List[str]) -> List[str]:
-        res = []
-        for column_name in column_names:
-            new_column_name = column_name.replace('(', '_').replace(')', '_').replace('.', '_')
-            res.append(new_column_name)
-        return res
+    def make_query(self, query: str, raw: bool = False):
+        # see DBClient.make_query
+        with self.db_connector.connection() as connection:
+            if raw:
+                return connection.query_np(query, settings=query_settings())
+            query = connection.query(query, settings=query_settings())
+        return make_records(query.column_names, query.result_rows)
 
-    def make_query(self, query: str) -> List[namedtuple]:
-        query = self.connection.query(query)
-        Record = namedtuple("Record", self.fix_column_names(query.column_names))
-        result = [Record(*item) for item in query.result_rows]
-        return result
+    def make_series_query(self, query: str) -> Series:
+        # see DBClient.make_series_query
+        return Series.from_array(self.make_query(query, raw=True))
 
     def generate_dates(self, from_date, to_date, grouping_function):
         mapper = {
@@ -69,7 +69,7 @@ class DBClientViews:
         """
 
     def get_default_statistics(self, from_date, to_date, grouping_function, view, sql_merge_function):
-        return self.make_query(f"""
+        return self.make_series_query(f"""
             select {grouping_function}(u.hh) as x,
                    a.y
             from (
@@ -92,7 +92,7 @@ class DBClientViews:
             sql_merge_function,
             operator_address
     ):
-        return self.make_query(f"""
+        return self.make_series_query(f"""
             SELECT {grouping_function}(timestamp_start_of_hour) AS x,
                    {sql_merge_function}(y) AS y
             FROM spacebox.{view}
@@ -215,7 +215,7 @@ class DBClientViews:
         filter = f"WHERE xx BETWEEN toStartOfMonth(DATE('{from_date}')) AND toStartOfMonth(DATE('{to_date}'))" \
             if grouping_function == 'toStartOfMonth' \
             else f"WHERE DATE(xx) BETWEEN '{from_date}' AND '{to_date}'"
-        return self.make_query(f"""
+        return self.make_series_query(f"""
             select {grouping_function}(u.hh) as x,
                    a.y
             from (
@@ -238,7 +238,7 @@ class DBClientViews:
             from_date = str((from_date.replace(day=1) - timedelta(days=1)).date())
         elif grouping_function == 'toStartOfWeek':
             from_date = str((from_date - timedelta(days=from_date.weekday()+1)).date())
-        return self.make_query(f"""
+        return self.make_series_query(f"""
             select {grouping_function}(u.hh) as x,
                    a.y
             from (
@@ -265,7 +265,7 @@ class DBClientViews:
             from_date = str((from_date - timedelta(days=from_date.weekday() + 1)).date())
         else:
             from_date = str(from_date.date())
-        return self.make_query(f"""
+        return self.make_series_query(f"""
             select {grouping_function}(u.hh) as x,
                    a.y
             from (
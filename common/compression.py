@@ -0,0 +1,191 @@
+import hashlib
+import struct
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Response
+
+from common.in_memory_cache import BoundedCache
+from config.settings import COMPRESSION_MIN_SIZE, COMPRESSION_CACHE_SIZE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        from backports import zstd
+    except ImportError:
+        zstd = None
+
+
+class GzipCompressor:
+
+    def __init__(self, level: int):
+        # wbits 31 writes a gzip header, with mtime 0 so the same data always compresses to the same bytes
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+class BrotliCompressor:
+
+    def __init__(self, level: int):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+    def finish(self) -> bytes:
+        return self.compressor.finish()
+
+
+class ZstdCompressor:
+
+    def __init__(self, level: int):
+        self.compressor = zstd.ZstdCompressor(level=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.compress(b'', zstd.ZstdCompressor.FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self.compressor.flush()
+
+
+# Content-Encoding -> (compressor, level for responses, level for data compressed once and served many times),
+# in order of preference when the client accepts several with the same quality.
+# brotli and zstd are optional, without them clients get gzip.
+COMPRESSORS = {}
+if brotli is not None:
+    COMPRESSORS['br'] = (BrotliCompressor, 4, 11)
+if zstd is not None:
+    COMPRESSORS['zstd'] = (ZstdCompressor, 3, 19)
+COMPRESSORS['gzip'] = (GzipCompressor, 6, 9)
+
+CONTINUABLE_ENCODINGS = {'gzip', 'zstd'}
+
+# gzip member header written by compress_prefix: deflate, no flags, mtime 0, unknown OS
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript', 'text/javascript'}
+
+# (hash of the body, encoding) -> compressed body, so an unchanged response is not compressed again,
+# (payload digest, encoding) -> compress_prefix() of a repeating PayloadResponse payload
+COMPRESSED_BODIES = BoundedCache(COMPRESSION_CACHE_SIZE)
+
+
+def create_compressor(encoding: str, static: bool = False):
+    compressor_class, level, static_level = COMPRESSORS[encoding]
+    return compressor_class(static_level if static else level)
+
+
+def compress(data: bytes, encoding: str, static: bool = False) -> bytes:
+    compressor = create_compressor(encoding, static)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_prefix(data: bytes, encoding: str) -> tuple:
+    """
+    (compressed bytes, CRC32, size) of `data` for an encoding in CONTINUABLE_ENCODINGS, in a form that
+    continue_prefix() can append more compressed data to. Only bytes are kept, no compressor state.
+    """
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(COMPRESSORS[encoding][1], zlib.DEFLATED, -15)
+        # the sync flush ends the deflate data on a byte aligned, non final block, so another
+        # deflate stream can follow it, the gzip trailer is written once the whole data is known
+        deflated = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        return GZIP_HEADER + deflated, zlib.crc32(data), len(data)
+    return compress(data, encoding), 0, len(data)
+
+
+def continue_prefix(prefix: tuple, data: bytes, encoding: str) -> bytes:
+    """The compress_prefix() data followed by `data`, compressed as one `encoding` stream."""
+    compressed, crc, size = prefix
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(COMPRESSORS[encoding][1], zlib.DEFLATED, -15)
+        trailer = struct.pack('<II', zlib.crc32(data, crc), (size + len(data)) & 0xffffffff)
+        return compressed + compressor.compress(data) + compressor.flush() + trailer
+    # a zstd stream may be a series of frames
+    return compressed + compress(data, encoding)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    compressor = create_compressor(encoding)
+    for chunk in chunks:
+        # flushed after every chunk so the client does not wait for the end of the stream to get the rows
+        compressed = compressor.compress(chunk) + compressor.flush()
+        if compressed:
+            yield compressed
+    yield compressor.finish()
+
+
+def negotiate_encoding(accept_encodings) -> Optional[str]:
+    """Best supported encoding for the request's Accept-Encoding header, honouring q-values."""
+    return accept_encodings.best_match(list(COMPRESSORS))
+
+
+def compress_body(body: bytes, encoding: str, payload_digest: Optional[str] = None, payload_size: int = 0,
+                  payload_repeats: bool = False) -> bytes:
+    """
+    `body` compressed, reusing an earlier result for the same data. A payload that repeats (see
+    conditional_on_height) differs between responses only in the envelope after its first `payload_size`
+    bytes (`response_time`), those bytes are compressed once under `payload_digest` and only the rest
+    for every response. Other payloads are unique to a request and compressed without caching.
+    """
+    if payload_digest is None:
+        key = (hashlib.blake2b(body, digest_size=16).digest(), encoding)
+        compressed = COMPRESSED_BODIES.get(key)
+        if compressed is None:
+            compressed = compress(body, encoding)
+            COMPRESSED_BODIES.set(key, compressed)
+        return compressed
+    if not payload_repeats or encoding not in CONTINUABLE_ENCODINGS:
+        # brotli output cannot be continued
+        return compress(body, encoding)
+    key = (payload_digest, encoding)
+    prefix = COMPRESSED_BODIES.get(key)
+    if prefix is None:
+        prefix = compress_prefix(body[:payload_size], encoding)
+        COMPRESSED_BODIES.set(key, prefix)
+    return continue_prefix(prefix, body[payload_size:], encoding)
+
+
+def compress_response(response: Response, accept_encodings) -> Response:
+    if response.status_code < 200 or response.status_code in (204, 206, 304) \
+            or response.content_encoding or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(accept_encodings)
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = compress_stream(response.iter_encoded(), encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESSION_MIN_SIZE:
+            return response
+        response.set_data(compress_body(body, encoding, getattr(response, 'payload_digest', None),
+                                        getattr(response, 'payload_size', 0), getattr(response, 'payload_repeats', False)))
+    response.content_encoding = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # a strong tag promises the exact bytes, which now depend on the encoding
+        response.set_etag(etag, weak=True)
+    return response
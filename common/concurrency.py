@@ -0,0 +1,87 @@
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from flask import g, has_app_context
+
+from config.settings import API_THREADS, CLICKHOUSE_POOL_SIZE, QUERY_FANOUT_WORKERS, QUERY_FANOUT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# shared by all request threads of a worker process, so a burst of requests cannot open more
+# than QUERY_FANOUT_WORKERS extra ClickHouse queries at once. Each request thread and each of these
+# may hold a pooled ClickHouse client, past CLICKHOUSE_POOL_SIZE they would only wait for one
+executor = ThreadPoolExecutor(max_workers=max(min(QUERY_FANOUT_WORKERS, CLICKHOUSE_POOL_SIZE - API_THREADS), 1),
+                              thread_name_prefix='query-fanout')
+
+# time.monotonic() by which the run_parallel task on this thread has to finish
+task_deadline = threading.local()
+
+
+def timed(task, deadline: float):
+    task_deadline.at = deadline
+    started_at = time.perf_counter()
+    try:
+        result = task()
+    finally:
+        task_deadline.at = None
+    return result, time.perf_counter() - started_at
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left to the deadline of the run_parallel task running on this thread, None outside one."""
+    deadline = getattr(task_deadline, 'at', None)
+    return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+
+def query_settings() -> dict:
+    """
+    ClickHouse settings for a query run by a run_parallel task, so the server stops it at the task's
+    deadline instead of it holding a pool thread and a client after run_parallel gave up on it.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return {}
+    # whole seconds, and at least one as 0 means no limit
+    return {'max_execution_time': max(math.ceil(remaining), 1)}
+
+
+def record_timing(name: str, duration: float):
+    if has_app_context():
+        g.setdefault('timings', {})[name] = duration
+
+
+def get_timings() -> dict:
+    """Durations in seconds of the sub-queries run for the current request."""
+    return g.get('timings', {}) if has_app_context() else {}
+
+
+def run_parallel(tasks: dict, timeout: float = QUERY_FANOUT_TIMEOUT, suppress_errors: bool = False) -> dict:
+    """
+    Runs independent callables on the shared executor and returns their results under the same keys.
+    All of them have to finish within `timeout` seconds. A failing or late task raises, or with
+    `suppress_errors` is logged and gives None. A task that already started cannot be cancelled, its
+    queries are limited to the time left instead (see query_settings). Tasks must not call run_parallel
+    themselves, they could wait for a pool thread that never frees up.
+    """
+    deadline = time.monotonic() + timeout
+    futures = {name: executor.submit(timed, task, deadline) for name, task in tasks.items()}
+    results = {}
+    try:
+        for name, future in futures.items():
+            try:
+                results[name], duration = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except Exception:
+                if not suppress_errors:
+                    raise
+                logger.exception(f'Query {name} failed')
+                results[name] = None
+            else:
+                record_timing(name, duration)
+    finally:
+        for future in futures.values():
+            future.cancel()
+    return results
@@ -1,22 +1,122 @@
+import threading
+import time
+from contextlib import contextmanager
+
 import clickhouse_connect
+from clickhouse_connect.driver import httputil
 
-from config.config import CLICKHOUSE_HOST, CLICKHOUSE_PORT, CLICKHOUSE_USERNAME, CLICKHOUSE_PASSWORD
+from common.concurrency import remaining_time
+from config.settings import CLICKHOUSE_HOST, CLICKHOUSE_PORT, CLICKHOUSE_USERNAME, CLICKHOUSE_PASSWORD, \
+    CLICKHOUSE_POOL_SIZE, CLICKHOUSE_POOL_TIMEOUT, CLICKHOUSE_POOL_IDLE_TIMEOUT, CLICKHOUSE_POOL_HEALTH_CHECK_INTERVAL
 
 
 class DBConnector(object):
+    """
+    Bounded pool of ClickHouse clients shared by all threads of a worker process.
+    A clickhouse_connect client holds a single server session and must not run queries
+    in parallel, so every query checks a client out with `connection()` and returns it after.
+    """
+    instance_lock = threading.Lock()
 
     def __new__(cls):
-        if not hasattr(cls, 'instance'):
-            cls.instance = super(DBConnector, cls).__new__(cls)
+        with cls.instance_lock:
+            if not hasattr(cls, 'instance'):
+                instance = super(DBConnector, cls).__new__(cls)
+                instance.setup()
+                cls.instance = instance
         return cls.instance
 
-    def __init__(self):
-        self.clickhouse_client = clickhouse_connect.get_client(
+    def setup(self):
+        self.condition = threading.Condition()
+        # (client, last time it was returned to the pool), the most recently used client is the last one
+        self.idle_clients = []
+        self.size = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.created = 0
+        self.evicted = 0
+        # one urllib3 pool for all clients so every client keeps its HTTP connection alive
+        self.pool_manager = httputil.get_pool_manager(maxsize=CLICKHOUSE_POOL_SIZE)
+
+    def create_client(self):
+        client = clickhouse_connect.get_client(
             host=CLICKHOUSE_HOST,
             port=CLICKHOUSE_PORT,
             username=CLICKHOUSE_USERNAME,
-            password=CLICKHOUSE_PASSWORD
+            password=CLICKHOUSE_PASSWORD,
+            pool_mgr=self.pool_manager
         )
+        with self.condition:
+            self.created += 1
+        return client
+
+    @contextmanager
+    def connection(self):
+        client = self.acquire()
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def acquire(self):
+        timeout = CLICKHOUSE_POOL_TIMEOUT
+        remaining = remaining_time()
+        if remaining is not None:
+            # a run_parallel task does not wait for a client past its own deadline
+            timeout = min(timeout, remaining)
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            self.evict_idle_clients()
+            while not self.idle_clients and self.size >= CLICKHOUSE_POOL_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f'No ClickHouse connection available after {timeout:.1f} seconds')
+                self.waiting += 1
+                self.condition.wait(remaining)
+                self.waiting -= 1
+            if self.idle_clients:
+                client, last_used = self.idle_clients.pop()
+            else:
+                client, last_used = None, None
+                self.size += 1
+            self.in_use += 1
+        try:
+            if client is None:
+                client = self.create_client()
+            elif time.monotonic() - last_used > CLICKHOUSE_POOL_HEALTH_CHECK_INTERVAL and not client.ping():
+                client.close()
+                client = self.create_client()
+        except Exception:
+            with self.condition:
+                self.size -= 1
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+        return client
+
+    def release(self, client):
+        with self.condition:
+            self.in_use -= 1
+            self.idle_clients.append((client, time.monotonic()))
+            self.condition.notify()
+
+    def evict_idle_clients(self):
+        # called with the condition held, idle clients are ordered from the least recently used
+        now = time.monotonic()
+        while self.idle_clients and now - self.idle_clients[0][1] > CLICKHOUSE_POOL_IDLE_TIMEOUT:
+            client, _ = self.idle_clients.pop(0)
+            client.close()
+            self.size -= 1
+            self.evicted += 1
 
-    def __del__(self):
-        self.clickhouse_client.close()
+    def get_metrics(self) -> dict:
+        with self.condition:
+            return {
+                'size': self.size,
+                'max_size': CLICKHOUSE_POOL_SIZE,
+                'in_use': self.in_use,
+                'idle': len(self.idle_clients),
+                'waiting': self.waiting,
+                'created': self.created,
+                'evicted': self.evicted,
+            }
@@ -1,9 +1,3 @@
-import json
-from collections import namedtuple
-from datetime import datetime, timedelta
-
-from config.config import NETWORK
-
 
 def response_decorator(func):
     def wrapper(*args, **kwargs):
@@ -28,9 +22,8 @@ def get_first_if_exists(func):
 def add_address_to_response(func):
     def wrapper(*args, **kwargs):
         response = func(*args, **kwargs)
-        data = response.json
-        data['address'] = kwargs.get('address')
-        response.data = json.dumps(data)
+        # not encoded yet, see common/serialization.py
+        response.payload['address'] = kwargs.get('address')
         return response
 
     wrapper.__name__ = func.__name__
@@ -59,8 +52,8 @@ def history_statistics_handler(func):
         new_args[3] = group_by
         new_args.append(from_height)
         new_args.append(to_height)
-        result = func(*tuple(new_args), **kwargs)
-        return [{'x': str(item.x), 'y': item.y} for item in result]
+        # a Series, encoded to [{'x': ..., 'y': ...}] by the JSON provider
+        return func(*tuple(new_args), **kwargs)
 
     return wrapper
 
@@ -80,7 +73,6 @@ def history_statistics_handler_for_view(func):
         group_by = detailing_mapper(args[3])
         new_args = list(args)
         new_args[3] = group_by
-        result = func(*tuple(new_args), **kwargs)
-        return [{'x': str(item.x), 'y': item.y} for item in result]
+        return func(*tuple(new_args), **kwargs)
 
     return wrapper
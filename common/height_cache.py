@@ -0,0 +1,143 @@
+import functools
+import threading
+import time
+from typing import Optional
+
+from flask import request, make_response
+
+from clients.db_client import DBClient
+from common.in_memory_cache import BoundedCache
+from config.settings import HEIGHT_PROBE_INTERVAL, HEIGHT_CACHE_MAX_SIZE, NETWORK
+
+
+class HeadHeightProbe:
+    """
+    Latest indexed block of the chain, asked from ClickHouse at most once every
+    HEIGHT_PROBE_INTERVAL seconds per worker process whatever the number of readers.
+    """
+
+    def __init__(self):
+        self.db_client = DBClient()
+        self.height = None
+        self.timestamp = None
+        self.probed_at = None
+        self.probes = 0
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        head_block = self.db_client.get_head_block()
+        self.height = head_block.height if head_block else None
+        self.timestamp = head_block.timestamp if head_block else None
+        self.probed_at = time.monotonic()
+        self.probes += 1
+
+    def is_stale(self) -> bool:
+        # time.monotonic() has an arbitrary origin and may be below HEIGHT_PROBE_INTERVAL, None is never probed
+        return self.probed_at is None or time.monotonic() - self.probed_at >= HEIGHT_PROBE_INTERVAL
+
+    def get_head(self) -> tuple:
+        if self.is_stale():
+            with self.lock:
+                # another thread may have probed while this one was waiting
+                if self.is_stale():
+                    self.refresh()
+        return self.height, self.timestamp
+
+    def get_height(self) -> Optional[int]:
+        return self.get_head()[0]
+
+
+class HeightCache:
+    """
+    Results of functions that only change when a new block is indexed, keyed by function,
+    arguments and the head height. Concurrent callers of the same key wait for one computation.
+    """
+
+    def __init__(self, probe: HeadHeightProbe):
+        self.probe = probe
+        # key -> (height, value)
+        self.entries = BoundedCache(HEIGHT_CACHE_MAX_SIZE)
+        self.key_locks = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_key_lock(self, key) -> threading.Lock:
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def count(self, hit: bool):
+        # += is not atomic across threads
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get_or_compute(self, key, compute):
+        height = self.probe.get_height()
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == height:
+            self.count(hit=True)
+            return entry[1]
+        with self.get_key_lock(key):
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == height:
+                self.count(hit=True)
+                return entry[1]
+            self.count(hit=False)
+            # stored under the height probed before computing, a block indexed meanwhile triggers a recompute
+            value = compute()
+            self.entries.set(key, (height, value))
+            return value
+
+    def get_metrics(self) -> dict:
+        return {
+            'head_height': self.probe.height,
+            'probes': self.probe.probes,
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+head_height_probe = HeadHeightProbe()
+height_cache = HeightCache(head_height_probe)
+
+
+def cached_by_height(func):
+    # the service instance is shared (see services/container.py) so it is left out of the key
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        key = (func.__qualname__, args, tuple(sorted(kwargs.items())))
+        return height_cache.get_or_compute(key, lambda: func(self, *args, **kwargs))
+
+    return wrapper
+
+
+def conditional_on_height(func):
+    """
+    View decorator for routes whose data only changes with a new block. The ETag is the head height,
+    so a client polling with a current tag gets `304 Not Modified` without any query being run.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        height, timestamp = head_height_probe.get_head()
+        if height is None:
+            return func(*args, **kwargs)
+        # weak, the body carries the response time and is never byte for byte the same
+        etag = f'{NETWORK}-{height}'
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(func(*args, **kwargs))
+            # the same payload until the next block, worth keeping compressed
+            response.payload_repeats = True
+        response.set_etag(etag, weak=True)
+        if timestamp:
+            response.last_modified = timestamp
+        # revalidate on every poll instead of letting browsers guess a freshness time from Last-Modified
+        response.cache_control.no_cache = True
+        return response
+
+    return wrapper
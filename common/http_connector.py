@@ -0,0 +1,132 @@
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import HTTP_POOL_SIZE_PER_HOST, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_TOTAL_TIMEOUT, \
+    HTTP_KEEPALIVE_TIMEOUT, HTTP_DNS_CACHE_TTL
+
+
+class HttpConnector(object):
+    """
+    Long lived HTTP sessions for LCD and price feed calls, shared by all threads of a worker process.
+    Sync calls go through one requests.Session. Async calls run on a single event loop living in
+    a background thread, with one aiohttp session, so connections and resolved DNS names are
+    reused between requests instead of being set up for every `asyncio.run`.
+    """
+    instance_lock = threading.Lock()
+
+    def __new__(cls):
+        with cls.instance_lock:
+            if not hasattr(cls, 'instance'):
+                instance = super(HttpConnector, cls).__new__(cls)
+                instance.setup()
+                cls.instance = instance
+        return cls.instance
+
+    def setup(self):
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE_PER_HOST)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.lock = threading.Lock()
+        self.loop_lock = threading.Lock()
+        self.loop = None
+        self.async_session = None
+        self.stats = {
+            'sync': {'requests': 0, 'in_flight': 0, 'errors': 0},
+            'async': {'requests': 0, 'in_flight': 0, 'errors': 0},
+        }
+
+    def count(self, kind: str, field: str, value: int = 1):
+        with self.lock:
+            self.stats[kind][field] += value
+
+    def get(self, url: str) -> requests.Response:
+        self.count('sync', 'requests')
+        self.count('sync', 'in_flight')
+        try:
+            return self.session.get(url, timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+        except requests.RequestException:
+            self.count('sync', 'errors')
+            raise
+        finally:
+            self.count('sync', 'in_flight', -1)
+
+    def run(self, coroutine, timeout: float = HTTP_TOTAL_TIMEOUT):
+        """
+        Runs a coroutine on the shared event loop and waits for its result, at most `timeout` seconds,
+        after which it is cancelled and concurrent.futures.TimeoutError raised.
+        """
+        self.start_loop()
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def start_loop(self):
+        with self.loop_lock:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='http-connector', daemon=True).start()
+            # the aiohttp session has to be created inside the loop it will be used in
+            asyncio.run_coroutine_threadsafe(self.create_async_session(), loop).result()
+            self.loop = loop
+            atexit.register(self.close)
+
+    async def create_async_session(self):
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self.on_async_request_start)
+        trace_config.on_request_end.append(self.on_async_request_end)
+        trace_config.on_request_exception.append(self.on_async_request_exception)
+        self.async_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit_per_host=HTTP_POOL_SIZE_PER_HOST,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            ),
+            # total also bounds a server that keeps sending a byte before every sock_read timeout,
+            # and the wait for a free connection
+            timeout=aiohttp.ClientTimeout(total=HTTP_TOTAL_TIMEOUT, sock_connect=HTTP_CONNECT_TIMEOUT,
+                                          sock_read=HTTP_READ_TIMEOUT),
+            trace_configs=[trace_config],
+        )
+
+    async def on_async_request_start(self, session, context, params):
+        self.count('async', 'requests')
+        self.count('async', 'in_flight')
+
+    async def on_async_request_end(self, session, context, params):
+        self.count('async', 'in_flight', -1)
+
+    async def on_async_request_exception(self, session, context, params):
+        self.count('async', 'in_flight', -1)
+        self.count('async', 'errors')
+
+    def close(self):
+        if self.async_session:
+            asyncio.run_coroutine_threadsafe(self.async_session.close(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.session.close()
+
+    def get_metrics(self) -> dict:
+        with self.lock:
+            metrics = {kind: dict(stats) for kind, stats in self.stats.items()}
+        pools = self.adapter.poolmanager.pools
+        metrics['sync']['hosts'] = {}
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool:
+                metrics['sync']['hosts'][f'{pool.host}:{pool.port}'] = {
+                    'connections_opened': pool.num_connections,
+                    'requests': pool.num_requests,
+                }
+        metrics['pool_size_per_host'] = HTTP_POOL_SIZE_PER_HOST
+        return metrics
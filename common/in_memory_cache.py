@@ -1,22 +1,132 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
 from common.constants import TOKENS_STARTED_FROM_U
+from config.settings import ASSET_CACHE_MAX_SIZE, ASSET_CACHE_TTL, ASSET_CACHE_NEGATIVE_TTL, ASSET_CACHE_SNAPSHOT_PATH
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedCache:
+    """
+    Thread safe LRU cache with an optional time to live per entry.
+    Entries are stored with their expiry as a wall clock timestamp so they can be
+    written to a snapshot file and loaded back by another process.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        missing = object()
+        return self.get(key, missing) is not missing
+
+    def __getitem__(self, key):
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            raise KeyError(key)
+        return value
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def dump(self) -> list:
+        with self.lock:
+            return [[key, value, expires_at] for key, (value, expires_at) in self.entries.items()]
+
+    def load(self, entries: list):
+        now = time.time()
+        with self.lock:
+            for key, value, expires_at in entries:
+                if expires_at is None or expires_at > now:
+                    self.entries[key] = (value, expires_at)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
+CACHED_SYMBOLS = BoundedCache(ASSET_CACHE_MAX_SIZE, ASSET_CACHE_TTL)
+CACHED_LOGOS = BoundedCache(ASSET_CACHE_MAX_SIZE, ASSET_CACHE_TTL)
+# the denom to search mapping is computed locally, it never goes stale
+CACHED_DENOMS_FOR_SEARCH = BoundedCache(ASSET_CACHE_MAX_SIZE)
+
+SNAPSHOT_CACHES = {
+    'symbols': CACHED_SYMBOLS,
+    'logos': CACHED_LOGOS,
+}
+
+
+def save_snapshot(path: str = ASSET_CACHE_SNAPSHOT_PATH):
+    snapshot = {name: cache.dump() for name, cache in SNAPSHOT_CACHES.items()}
+    # write to a temporary file first, several workers may save at the same time
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temporary_path, 'w') as snapshot_file:
+            json.dump(snapshot, snapshot_file)
+        os.replace(temporary_path, path)
+    except OSError:
+        logger.exception('Could not save asset metadata snapshot')
+
 
-CACHED_SYMBOLS = {}
-CACHED_LOGOS = {}
-CACHED_DENOMS_FOR_SEARCH = {}
+def load_snapshot(path: str = ASSET_CACHE_SNAPSHOT_PATH):
+    try:
+        with open(path) as snapshot_file:
+            snapshot = json.load(snapshot_file)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError):
+        logger.exception('Could not load asset metadata snapshot')
+        return
+    for name, cache in SNAPSHOT_CACHES.items():
+        cache.load(snapshot.get(name, []))
 
 
 def set_cached_denoms(mapped_denoms):
     for denom in mapped_denoms:
-        CACHED_SYMBOLS[denom['denom']] = denom['symbol']
+        # unresolved denoms are cached as None for a shorter time so they are not asked for on every request
+        ttl = ASSET_CACHE_NEGATIVE_TTL if not denom['symbol'] else None
+        CACHED_SYMBOLS.set(denom['denom'], denom['symbol'], ttl)
 
 
 def set_cached_logos(logos):
     for logo in logos:
-        CACHED_LOGOS[logo['symbol']] = logo['logo']
+        # tokens without a logo are cached as '' for a shorter time
+        ttl = ASSET_CACHE_NEGATIVE_TTL if not logo['logo'] else None
+        CACHED_LOGOS.set(logo['symbol'], logo['logo'], ttl)
 
 
 def get_denom_to_search_in_api(denom):
-    if denom not in CACHED_DENOMS_FOR_SEARCH:
+    denom_to_search = CACHED_DENOMS_FOR_SEARCH.get(denom)
+    if denom_to_search is None:
         denom_to_search = denom
         if denom not in TOKENS_STARTED_FROM_U and (
                 denom.startswith('u') or denom.startswith('stu')):
@@ -29,7 +139,5 @@ def get_denom_to_search_in_api(denom):
             denom_to_search = 'atom'
         elif denom == 'stuosmo':
             denom_to_search = 'osmo'
-        CACHED_DENOMS_FOR_SEARCH[denom] = denom_to_search
-        return denom_to_search
-    else:
-        return CACHED_DENOMS_FOR_SEARCH[denom]
+        CACHED_DENOMS_FOR_SEARCH.set(denom, denom_to_search)
+    return denom_to_search
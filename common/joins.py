@@ -0,0 +1,40 @@
+from collections import defaultdict
+from operator import attrgetter
+from typing import Iterable, List, Union
+
+
+def index_by(rows: Iterable, key: Union[str, tuple], first: bool = False) -> dict:
+    """
+    Indexes query rows by one attribute or a tuple of attributes. When several rows share a key
+    the last one is kept, or the first one with `first`.
+    """
+    get_key = attrgetter(*key) if isinstance(key, tuple) else attrgetter(key)
+    index = {}
+    for row in rows:
+        row_key = get_key(row)
+        if not first or row_key not in index:
+            index[row_key] = row
+    return index
+
+
+def group_by(rows: Iterable, key: Union[str, tuple]) -> dict:
+    """Lists of query rows by one attribute or a tuple of attributes, in query order."""
+    get_key = attrgetter(*key) if isinstance(key, tuple) else attrgetter(key)
+    groups = defaultdict(list)
+    for row in rows:
+        groups[get_key(row)].append(row)
+    return groups
+
+
+def left_join(items: List[dict], rows: Iterable, on: str, fields: dict, row_key: str = None, default=None) -> List[dict]:
+    """
+    Copies `fields` ({item field: row attribute}) into every item from the row whose `row_key`
+    (by default the same name as `on`) equals the item's `on` field, or sets `default` when no row
+    matches. Runs in O(len(items) + len(rows)).
+    """
+    index = index_by(rows, row_key or on)
+    for item in items:
+        row = index.get(item.get(on))
+        for field, attribute in fields.items():
+            item[field] = getattr(row, attribute) if row is not None else default
+    return items
@@ -0,0 +1,62 @@
+import base64
+import binascii
+import json
+from typing import Optional, Sequence
+
+from werkzeug.exceptions import BadRequest
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Opaque token for the sort key of the last row of a page, the client sends it back as `cursor`."""
+    return base64.urlsafe_b64encode(json.dumps(list(values), separators=(',', ':')).encode()).rstrip(b'=').decode()
+
+
+def next_cursor(items: list, key: Sequence[str]) -> Optional[str]:
+    """Cursor for the page after `items` from the `key` fields of its last item, None after an empty page."""
+    return encode_cursor([items[-1][field] for field in key]) if items else None
+
+
+def sql_literal(value) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+    # larger literals would be read as Float64 and compare inexactly with UInt128/UInt256 columns
+    return str(value) if value < 2 ** 63 else f"toUInt256('{value}')"
+
+
+class Keyset:
+    """
+    Sort order of a paginated query, (column, 'ASC' or 'DESC') pairs. A cursor holds the values of these
+    columns for the last row sent, the next page is the rows after it in this order, found through the
+    sorting key instead of computing and skipping OFFSET rows. The columns must tell every row apart,
+    rows equal in all of them would be skipped when a page ends among them.
+    """
+
+    def __init__(self, *order):
+        self.order = order
+
+    def decode(self, cursor: Optional[str]) -> Optional[list]:
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        except (binascii.Error, ValueError):
+            raise BadRequest('Invalid cursor')
+        if not isinstance(values, list) or len(values) != len(self.order) \
+                or not all(isinstance(value, (int, str)) and not isinstance(value, bool) for value in values):
+            raise BadRequest('Invalid cursor')
+        return values
+
+    def condition(self, after: list) -> str:
+        # height DESC, tx_hash ASC after (10, 'ab'): height < 10 OR (height = 10 AND (tx_hash > 'ab'))
+        (column, direction), value = self.order[0], sql_literal(after[0])
+        condition = f"{column} {'<' if direction.upper() == 'DESC' else '>'} {value}"
+        if len(self.order) > 1:
+            condition += f' OR ({column} = {value} AND ({Keyset(*self.order[1:]).condition(after[1:])}))'
+        return condition
+
+    def filter(self, after: Optional[list], prefix: str) -> str:
+        """`prefix` (WHERE or AND) and the condition for the rows after the cursor, empty without one."""
+        return f'{prefix} ({self.condition(after)})' if after else ''
+
+    def order_by(self) -> str:
+        return ', '.join(f'{column} {direction}' for column, direction in self.order)
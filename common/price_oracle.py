@@ -0,0 +1,94 @@
+import logging
+import random
+import threading
+import time
+from typing import Optional
+
+from clients.bronbro_api_client import BronbroApiClient
+from config.settings import PRICE_ORACLE_REFRESH_INTERVAL, PRICE_ORACLE_REFRESH_JITTER
+
+logger = logging.getLogger(__name__)
+
+
+class PriceOracle:
+    """
+    Process wide snapshot of price_feed_api/tokens/ by symbol and by lower cased symbol.
+    The first load happens in start(), after which a daemon thread refreshes it every
+    PRICE_ORACLE_REFRESH_INTERVAL seconds (plus up to PRICE_ORACLE_REFRESH_JITTER seconds so
+    workers do not hit the price feed together). Readers always get the last good snapshot
+    and never call the price feed themselves.
+    """
+
+    def __init__(self):
+        self.bronbro_api_client = BronbroApiClient()
+        # symbol -> exchange rate
+        self.snapshot = {}
+        # lower cased symbol -> exchange rate, how balance denoms are looked up
+        self.snapshot_by_denom = {}
+        self.updated_at = None
+        self.refresh_failures = 0
+        self.refresher = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.refresher is not None:
+            return
+        with self.lock:
+            if self.refresher is None:
+                # blocks for at most the HTTP timeouts, so the first requests do not see an empty snapshot
+                try:
+                    self.refresh()
+                except Exception:
+                    # the refresher still starts, a failed first load must not fail the worker or every reader
+                    logger.exception('Price snapshot refresh failed')
+                self.refresher = threading.Thread(target=self.refresh_forever, name='price-oracle', daemon=True)
+                self.refresher.start()
+
+    def refresh_forever(self):
+        while True:
+            time.sleep(PRICE_ORACLE_REFRESH_INTERVAL + random.uniform(0, PRICE_ORACLE_REFRESH_JITTER))
+            try:
+                self.refresh()
+            except Exception:
+                # the thread must outlive any bad feed response, or prices silently stop updating
+                logger.exception('Price snapshot refresh failed')
+
+    def refresh(self):
+        try:
+            exchange_rates = self.bronbro_api_client.get_exchange_rates()
+        except Exception:
+            logger.exception('Price feed request failed')
+            exchange_rates = None
+        # entries without a symbol cannot be looked up
+        exchange_rates = [exchange_rate for exchange_rate in exchange_rates or []
+                          if isinstance(exchange_rate, dict) and isinstance(exchange_rate.get('symbol'), str)]
+        if not exchange_rates:
+            # keep serving the previous snapshot, the age metric shows that it is getting stale
+            self.refresh_failures += 1
+            return
+        # build new dicts and swap each in one assignment so readers never see a partial snapshot
+        self.snapshot = {exchange_rate['symbol']: exchange_rate for exchange_rate in exchange_rates}
+        self.snapshot_by_denom = {exchange_rate['symbol'].lower(): exchange_rate for exchange_rate in exchange_rates}
+        self.updated_at = time.time()
+
+    def get_rate(self, symbol: str) -> Optional[dict]:
+        self.start()
+        return self.snapshot.get(symbol)
+
+    def get_rate_for_denom(self, denom_to_search: str) -> Optional[dict]:
+        """Rate whose lower cased symbol is `denom_to_search` (see get_denom_to_search_in_api)."""
+        self.start()
+        return self.snapshot_by_denom.get(denom_to_search)
+
+    def get_snapshot_age(self) -> Optional[float]:
+        return time.time() - self.updated_at if self.updated_at else None
+
+    def get_metrics(self) -> dict:
+        return {
+            'snapshot_age': self.get_snapshot_age(),
+            'symbols': len(self.snapshot),
+            'refresh_failures': self.refresh_failures,
+        }
+
+
+price_oracle = PriceOracle()
@@ -0,0 +1,25 @@
+from collections import namedtuple
+from functools import lru_cache
+from typing import List, Sequence
+
+
+def fix_column_names(column_names: Sequence[str]) -> List[str]:
+    res = []
+    for column_name in column_names:
+        new_column_name = column_name.replace('(', '_').replace(')', '_').replace('.', '_')
+        res.append(new_column_name)
+    return res
+
+
+@lru_cache(maxsize=1024)
+def get_record_class(column_names: tuple) -> type:
+    """
+    Row class for a result with these columns. Creating a namedtuple class is slow, the queries
+    are fixed so the same few hundred column lists come back over and over.
+    """
+    return namedtuple('Record', fix_column_names(column_names))
+
+
+def make_records(column_names: Sequence[str], rows: Sequence[Sequence]) -> List[namedtuple]:
+    # namedtuples have empty __slots__, a row costs no more than a plain tuple
+    return list(map(get_record_class(tuple(column_names))._make, rows))
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import time
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, Iterator
+
+import orjson
+from flask import Response
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+from common.series import Series
+
+# keys are sorted and dates written as HTTP dates to keep the output of flask's default provider
+OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY
+
+
+def default(value):
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    if isinstance(value, Series):
+        return value.to_list()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def orjson_default(value):
+    # a Series is inserted already encoded, orjson < 3.9 has no Fragment and gets the list of points
+    if isinstance(value, Series) and hasattr(orjson, 'Fragment'):
+        return orjson.Fragment(value.to_json(dumps))
+    return default(value)
+
+
+def dumps(value) -> bytes:
+    try:
+        return orjson.dumps(value, default=orjson_default, option=OPTIONS)
+    except orjson.JSONEncodeError:
+        # orjson only handles 64 bit integers, UInt128/UInt256 columns go through the standard encoder
+        return json.dumps(value, default=default, sort_keys=True, separators=(',', ':')).encode()
+
+
+def add_fields(body: bytes, fields: dict) -> bytes:
+    """Appends fields to an encoded non empty JSON object without decoding it."""
+    return body[:-1] + b',' + dumps(fields)[1:]
+
+
+class PayloadResponse(Response):
+    """
+    JSON response whose body is encoded once in the after_request hook, after the envelope
+    fields (`address`, `network`, `response_time`) are known. Until then the data is in `payload`.
+    """
+
+    def __init__(self, payload, **kwargs):
+        super().__init__(**kwargs)
+        self.payload = payload
+        self.payload_digest = None
+        self.payload_size = 0
+        # set for routes whose payload is the same for many requests, see compress_body
+        self.payload_repeats = False
+
+    def encode(self) -> bytes:
+        body = dumps(self.payload)
+        self.set_data(body)
+        # the body up to its closing brace is the same for the same payload whatever the envelope,
+        # compress_response keeps its compressed form under this digest
+        self.payload_digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.payload_size = len(body) - 1
+        return body
+
+
+class StreamedPayloadResponse(Response):
+    """
+    JSON object whose `key` list is encoded and sent a block of rows at a time while the query result
+    arrives. The `envelope` fields are written after the list, callables among them are called then.
+    The after_request hook adds `network` and sets `started_at` so that `response_time` covers the
+    whole stream.
+    """
+
+    def __init__(self, key: str, blocks: Iterable[list], envelope: dict, **kwargs):
+        super().__init__(self.generate(), **kwargs)
+        self.key = key
+        self.blocks = blocks
+        self.envelope = envelope
+        self.started_at = None
+
+    def generate(self) -> Iterator[bytes]:
+        blocks = iter(self.blocks)
+        # nothing is sent before the first block is read, a query failing right away still gets a 500
+        block = next(blocks, [])
+        yield b'{' + dumps(self.key) + b':[' + dumps(block)[1:-1]
+        separator = b',' if block else b''
+        for block in blocks:
+            if block:
+                yield separator + dumps(block)[1:-1]
+                separator = b','
+        envelope = {name: value() if callable(value) else value for name, value in self.envelope.items()}
+        if self.started_at is not None:
+            envelope['response_time'] = int((time.perf_counter() - self.started_at) * 1000)
+        yield b']' + (b',' + dumps(envelope)[1:] if envelope else b'}')
+
+
+class JsonProvider(JSONProvider):
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        return PayloadResponse(self._prepare_response_obj(args, kwargs), mimetype=self.mimetype)
@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import List, Sequence
+
+import numpy as np
+import orjson
+
+
+def to_datetime64(values: Sequence) -> np.ndarray:
+    # Date columns (DATE, toStartOfWeek, toStartOfMonth) keep day precision so they print as YYYY-MM-DD
+    unit = 's' if len(values) and isinstance(values[0], datetime) else 'D'
+    return np.array(values, dtype=f'datetime64[{unit}]')
+
+
+class Series:
+    """
+    History statistics as two arrays, bucket timestamps `x` and values `y`, filled straight from
+    the NumPy result of a query. Encodes to the same [{"x": "...", "y": ...}] list as before
+    without creating a dict per bucket.
+    """
+
+    __slots__ = ('x', 'y')
+
+    def __init__(self, x: np.ndarray, y: np.ndarray):
+        self.x = x
+        self.y = y
+
+    @classmethod
+    def from_array(cls, result: np.ndarray) -> 'Series':
+        """Series of a query_np result with columns x and y."""
+        if not len(result):
+            return cls(np.array([], dtype='datetime64[D]'), np.array([]))
+        x = result['x']
+        # clickhouse_connect falls back to object columns when any column is Nullable
+        if x.dtype.kind != 'M':
+            x = to_datetime64(x.tolist())
+        # fields of a structured array are strided views, orjson only encodes contiguous arrays
+        return cls(np.ascontiguousarray(x), np.ascontiguousarray(result['y']))
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def align(self, other: 'Series') -> tuple:
+        """
+        (x, y of this series, y of `other`) for the buckets both have, so that series read by separate
+        queries, where one may miss a bucket, can be combined element by element.
+        """
+        x, indices, other_indices = np.intersect1d(self.x, other.x, assume_unique=True, return_indices=True)
+        return x, self.y[indices], other.y[other_indices]
+
+    def labels(self) -> List[str]:
+        # same text as str() of the date or datetime the query returned
+        if not len(self):
+            return []
+        return np.char.replace(np.datetime_as_string(self.x), 'T', ' ').tolist()
+
+    def to_list(self) -> List[dict]:
+        return [{'x': x, 'y': y} for x, y in zip(self.labels(), self.y.tolist())]
+
+    def to_json(self, dumps) -> bytes:
+        """`dumps` encodes the values when they are not plain numbers (Decimal, very large integers)."""
+        if not len(self):
+            return b'[]'
+        if self.y.dtype.kind in 'biuf':
+            # nan and inf, e.g. a ratio over an empty bucket, are written as null
+            values = orjson.dumps(self.y, option=orjson.OPT_SERIALIZE_NUMPY)
+        else:
+            values = dumps(self.y.tolist())
+        # encoded numbers and strings of numbers contain no commas
+        items = zip(self.labels(), values[1:-1].split(b','))
+        return b'[' + b','.join(b'{"x":"%s","y":%s}' % (x.encode(), y) for x, y in items) + b']'
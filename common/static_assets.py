@@ -0,0 +1,48 @@
+import hashlib
+import mimetypes
+import threading
+from typing import Optional
+
+from flask import Response, request
+
+from common.compression import COMPRESSORS, compress
+from config.settings import STATIC_MAX_AGE
+
+
+class StaticAsset:
+    """
+    File read once when the worker starts and compressed the first time each encoding is asked for,
+    so serving it only picks the variant matching the client's Accept-Encoding. The file must not change
+    while the process runs.
+    """
+
+    def __init__(self, path: str, mimetype: str = None):
+        with open(path, 'rb') as asset_file:
+            self.data = asset_file.read()
+        self.mimetype = mimetype or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.etag = hashlib.sha256(self.data).hexdigest()[:32]
+        # Content-Encoding -> compressed body, None when it is not smaller than the file
+        self.variants = {}
+        self.lock = threading.Lock()
+
+    def variant(self, encoding: str) -> Optional[bytes]:
+        with self.lock:
+            if encoding not in self.variants:
+                compressed = compress(self.data, encoding, static=True)
+                self.variants[encoding] = compressed if len(compressed) < len(self.data) else None
+            return self.variants[encoding]
+
+    def response(self) -> Response:
+        encoding = request.accept_encodings.best_match(list(COMPRESSORS))
+        body = self.variant(encoding) if encoding else None
+        response = Response(body or self.data, mimetype=self.mimetype)
+        if body:
+            response.content_encoding = encoding
+            # a strong tag identifies exact bytes, so every encoding gets its own
+            response.set_etag(f'{self.etag}-{encoding}')
+        else:
+            response.set_etag(self.etag)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        return response.make_conditional(request)
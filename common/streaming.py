@@ -0,0 +1,45 @@
+from typing import Callable, Iterator, Sequence, Union
+
+from flask import Response, jsonify, request, stream_with_context
+
+from common.pagination import next_cursor
+from common.serialization import JsonProvider, StreamedPayloadResponse
+
+
+def stream_requested() -> bool:
+    """`?stream=1`, the client takes the list as it is read from ClickHouse instead of in one piece."""
+    return request.args.get('stream') in ('1', 'true')
+
+
+def map_blocks(result: Union[list, Iterator[list]], func: Callable[[list], list]) -> Union[list, Iterator[list]]:
+    """
+    Applies `func` to the rows of a query result, once to the list from make_query or to every block
+    of make_stream_query as it is read.
+    """
+    if isinstance(result, list):
+        return func(result)
+    return map(func, result)
+
+
+def jsonify_rows(key: str, result: Union[list, Iterator[list]], cursor_key: Sequence[str] = None, **fields) -> Response:
+    """
+    jsonify({key: result, **fields}), streamed block by block when `result` comes from a stream query.
+    With `cursor_key`, the fields of the rows' sort order, `next_cursor` is added for the following page.
+    """
+    if isinstance(result, list):
+        if cursor_key:
+            fields['next_cursor'] = next_cursor(result, cursor_key)
+        return jsonify({key: result, **fields})
+    if cursor_key:
+        last_rows = []
+
+        def remember_last_row(blocks):
+            for block in blocks:
+                if block:
+                    last_rows[:] = block[-1:]
+                yield block
+
+        result = remember_last_row(result)
+        fields['next_cursor'] = lambda: next_cursor(last_rows, cursor_key)
+    # keeps the request context for the queries run while the body is written
+    return StreamedPayloadResponse(key, stream_with_context(result), fields, mimetype=JsonProvider.mimetype)
@@ -0,0 +1,51 @@
+# Defaults for the settings that deployments may leave out of config/config.py,
+# a value set there takes precedence (see config/settings.py and the README)
+
+# gunicorn
+API_WORKERS = 2
+API_THREADS = 8
+API_KEEPALIVE = 5
+API_TIMEOUT = 120
+API_GRACEFUL_TIMEOUT = 30
+API_MAX_REQUESTS = 0
+API_MAX_REQUESTS_JITTER = 0
+
+# ClickHouse client pool, per worker process, API_THREADS + QUERY_FANOUT_WORKERS
+CLICKHOUSE_POOL_SIZE = 16
+CLICKHOUSE_POOL_TIMEOUT = 10
+CLICKHOUSE_POOL_IDLE_TIMEOUT = 300
+CLICKHOUSE_POOL_HEALTH_CHECK_INTERVAL = 60
+
+# LCD and price feed calls
+HTTP_POOL_SIZE_PER_HOST = 20
+HTTP_CONNECT_TIMEOUT = 3
+HTTP_READ_TIMEOUT = 10
+# whole async request, and HttpConnector.run() waiting for a batch of them
+HTTP_TOTAL_TIMEOUT = 15
+HTTP_KEEPALIVE_TIMEOUT = 30
+HTTP_DNS_CACHE_TTL = 300
+
+# denom symbols and token logos
+ASSET_CACHE_MAX_SIZE = 10000
+ASSET_CACHE_TTL = 24 * 3600
+ASSET_CACHE_NEGATIVE_TTL = 600
+# on the volume docker-compose.yml mounts at /data, so the snapshot survives a redeploy
+ASSET_CACHE_SNAPSHOT_PATH = '/data/asset_cache.json'
+
+PRICE_ORACLE_REFRESH_INTERVAL = 60
+PRICE_ORACLE_REFRESH_JITTER = 5
+
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CACHE_SIZE = 256
+STATIC_MAX_AGE = 3600
+
+# threads per worker process for the parallel sub-queries of one request (common/concurrency.py).
+# Request threads and these threads each hold a ClickHouse client while querying, so
+# CLICKHOUSE_POOL_SIZE should be at least API_THREADS + QUERY_FANOUT_WORKERS, the executor is
+# capped at CLICKHOUSE_POOL_SIZE - API_THREADS
+QUERY_FANOUT_WORKERS = 8
+# queries still running at the deadline are stopped by ClickHouse (max_execution_time)
+QUERY_FANOUT_TIMEOUT = 30
+
+HEIGHT_PROBE_INTERVAL = 1
+HEIGHT_CACHE_MAX_SIZE = 256
@@ -0,0 +1,4 @@
+# config/config.py belongs to the deployment and is not in the repository, settings it leaves out
+# come from config/defaults.py so an older config file keeps working after an upgrade
+from config.defaults import *  # noqa: F401,F403
+from config.config import *  # noqa: F401,F403
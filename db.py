@@ -1,4 +1,4 @@
-from config.config import CLICKHOUSE_HOST, CLICKHOUSE_PASSWORD, CLICKHOUSE_PORT, CLICKHOUSE_USERNAME, LCD_API,\
+from config.settings import CLICKHOUSE_HOST, CLICKHOUSE_PASSWORD, CLICKHOUSE_PORT, CLICKHOUSE_USERNAME, LCD_API,\
                             STAKED_DENOM
 import clickhouse_connect
 import requests
@@ -0,0 +1,27 @@
+from config.settings import API_HOST, API_PORT, API_WORKERS, API_THREADS, API_KEEPALIVE, API_TIMEOUT, \
+    API_GRACEFUL_TIMEOUT, API_MAX_REQUESTS, API_MAX_REQUESTS_JITTER
+
+# Production entry point: gunicorn -c gunicorn.conf.py main:app
+# Every worker process imports the app on its own (no preload), so ClickHouse clients,
+# HTTP sessions and caches are created after the fork and shared by the threads of that worker.
+bind = f'{API_HOST}:{API_PORT}'
+workers = API_WORKERS
+worker_class = 'gthread'
+threads = API_THREADS
+keepalive = API_KEEPALIVE
+timeout = API_TIMEOUT
+# `kill -HUP <master pid>` restarts workers one by one, letting in-flight requests finish within this timeout
+graceful_timeout = API_GRACEFUL_TIMEOUT
+max_requests = API_MAX_REQUESTS
+max_requests_jitter = API_MAX_REQUESTS_JITTER
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = 'info'
+
+
+def worker_exit(server, worker):
+    # keep resolved denoms and logos for the next worker, it loads them on start
+    from common.in_memory_cache import save_snapshot
+    save_snapshot()
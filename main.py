@@ -1,19 +1,26 @@
-import json
+import os
 import time
 
 from logging.config import dictConfig
 from flask import Flask, jsonify, request
 from flask.globals import app_ctx, current_app
+import flask_swagger_ui
 from flask_swagger_ui import get_swaggerui_blueprint
 
+from common.compression import compress_response
+from common.concurrency import get_timings
+from common.db_connector import DBConnector
 from common.decorators import add_address_to_response
-from config.config import API_HOST, API_PORT, NETWORK
-from services.account import AccountService
-from services.distribution import DistributionService
-from services.parameters import ParametersService
-from services.proposal import ProposalService
-from services.statistics import StatisticsService
-from services.validator import ValidatorService
+from common.height_cache import height_cache, conditional_on_height
+from common.http_connector import HttpConnector
+from common.in_memory_cache import load_snapshot, save_snapshot
+from common.pagination import next_cursor
+from common.price_oracle import price_oracle
+from common.serialization import JsonProvider, PayloadResponse, StreamedPayloadResponse, add_fields
+from common.static_assets import StaticAsset
+from common.streaming import jsonify_rows, stream_requested
+from config.settings import API_HOST, API_PORT, NETWORK
+from services.container import container
 
 
 dictConfig({
@@ -33,10 +40,19 @@ dictConfig({
 })
 
 app = Flask(__name__)
+app.json = JsonProvider(app)
+price_oracle.start()
+load_snapshot()
+
+
+swagger_spec = StaticAsset('./config/swagger.json')
+# Swagger UI files, served compressed in place of the blueprint's send_from_directory (see below)
+SWAGGER_UI_DIST = os.path.join(os.path.dirname(flask_swagger_ui.__file__), 'dist')
+swagger_ui_assets = {name: StaticAsset(os.path.join(SWAGGER_UI_DIST, name)) for name in os.listdir(SWAGGER_UI_DIST)}
 
 
 @app.route('/swagger-ui')
-def doc(): return open('./config/swagger.json').read()
+def doc(): return swagger_spec.response()
 
 
 SWAGGER_URL = '/swagger-ui'  # URL for exposing Swagger UI (without trailing '/')
@@ -51,11 +67,21 @@ swaggerui_blueprint = get_swaggerui_blueprint(
     }
 )
 
+
+@swaggerui_blueprint.before_request
+def send_swagger_ui_asset():
+    asset = swagger_ui_assets.get((request.view_args or {}).get('path'))
+    if asset is not None:
+        return asset.response()
+
+
+app.register_blueprint(swaggerui_blueprint)
+
 # API using clickhouse
 # @app.route('/account/account_balance/<address>')
 # @add_address_to_response
 # def account_balance(address):
-#     account_service = AccountService()
+#     account_service = container.account_service
 #     return jsonify(account_service.get_account_balance(address))
 
 
@@ -63,14 +89,14 @@ swaggerui_blueprint = get_swaggerui_blueprint(
 @app.route('/account/account_balance/<address>')
 @add_address_to_response
 def account_balance(address):
-    account_service = AccountService()
+    account_service = container.account_service
     return jsonify(account_service.get_account_balance_2(address))
 
 
 @app.route('/account/validators/<address>')
 @add_address_to_response
 def account_validators(address):
-    account_service = AccountService()
+    account_service = container.account_service
     return jsonify({'validators': account_service.get_validators(address)})
 
 
@@ -78,63 +104,66 @@ def account_validators(address):
 @add_address_to_response
 def account_votes(address):
     proposal_id = request.args.get('proposal_id', None)
-    account_service = AccountService()
+    account_service = container.account_service
     return jsonify({'votes': account_service.get_votes(address, proposal_id)})
 
 
 @app.route('/account/account_info/<address>')
 @add_address_to_response
 def account_info(address):
-    account_service = AccountService()
+    account_service = container.account_service
     return jsonify(account_service.get_account_info(address))
 
 
 @app.route('/gov/proposal/<id>')
 def proposal(id):
-    proposal_service = ProposalService()
+    proposal_service = container.proposal_service
     return jsonify(proposal_service.get_proposal(id))
 
 
 @app.route('/gov/proposals')
 def proposals():
-    proposal_service = ProposalService()
+    proposal_service = container.proposal_service
     limit = request.args.get('limit')
     offset = request.args.get('offset')
-    return jsonify({'proposals': proposal_service.get_proposals(limit, offset, request.args)})
+    cursor = request.args.get('cursor')
+    result = proposal_service.get_proposals(limit, offset, request.args, stream_requested(), cursor)
+    return jsonify_rows('proposals', result, cursor_key=('id',))
 
 
 @app.route('/gov/votes')
 def votes():
-    proposal_service = ProposalService()
+    proposal_service = container.proposal_service
     limit = request.args.get('limit')
     offset = request.args.get('offset')
     order_by = request.args.get('order_by')
-    votes, total = proposal_service.get_votes(limit, offset, order_by)
-    return jsonify({'votes': votes, 'total': total})
+    cursor = request.args.get('cursor')
+    votes, total = proposal_service.get_votes(limit, offset, order_by, cursor)
+    return jsonify({'votes': votes, 'total': total, 'next_cursor': next_cursor(votes, ('id',))})
 
 
 @app.route('/gov/votes/<id>')
 def vote(id):
-    proposal_service = ProposalService()
+    proposal_service = container.proposal_service
     return jsonify(proposal_service.get_vote(id))
 
 
 @app.route('/gov/votes/<id>/validators-info')
 def vote_based_on_validators(id):
-    proposal_service = ProposalService()
+    proposal_service = container.proposal_service
     validator_option = request.args.get('validator_option')
     return jsonify({'delegators': proposal_service.get_delegators_votes_info_for_proposal(id, validator_option)})
 
 
 @app.route('/gov/votes/<id>/validators-info/<validator_address>')
 def votes_of_specific_validator(id, validator_address):
-    proposal_service = ProposalService()
+    proposal_service = container.proposal_service
     return jsonify(proposal_service.get_validator_delegators_votes_info_for_proposal(id, validator_address))
 
 
 @app.route('/statistics/validators')
 def validators():
-    validator_service = ValidatorService()
+    validator_service = container.validator_service
     limit = request.args.get('limit')
     offset = request.args.get('offset')
     return jsonify({'validators': validator_service.get_validators(limit, offset)})
@@ -142,13 +171,13 @@ def validators():
 
 @app.route('/statistics/validators/group_map')
 def validators_group_map():
-    validator_service = ValidatorService()
+    validator_service = container.validator_service
     return jsonify({'validators': validator_service.get_validators_group_map()})
 
 
 @app.route('/statistics/validators/<operator_address>')
 def validator_by_operator_address(operator_address):
-    validator_service = ValidatorService()
+    validator_service = container.validator_service
     return jsonify(validator_service.get_validator_by_operator_address(operator_address))
 
 
@@ -157,7 +186,7 @@ def validator_by_operator_address_commissions(operator_address):
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    result = ValidatorService().get_validator_commissions(from_date, to_date, detailing, operator_address)
+    result = container.validator_service.get_validator_commissions(from_date, to_date, detailing, operator_address)
     return jsonify({'data': result, 'name': 'validator_commissions'})
 
 
@@ -166,7 +195,7 @@ def validator_by_operator_address_rewards(operator_address):
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    result = ValidatorService().get_validator_rewards(from_date, to_date, detailing, operator_address)
+    result = container.validator_service.get_validator_rewards(from_date, to_date, detailing, operator_address)
     return jsonify({'data': result, 'name': 'validator_rewards'})
 
 
@@ -175,7 +204,7 @@ def validator_voting_power(operator_address):
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    result = ValidatorService().get_validator_voting_power(from_date, to_date, detailing, operator_address)
+    result = container.validator_service.get_validator_voting_power(from_date, to_date, detailing, operator_address)
     return jsonify({'data': result, 'name': 'validator_voting_power'})
 
 
@@ -184,7 +213,7 @@ def validator_by_operator_address_uptime_stat(operator_address):
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    result = ValidatorService().get_validator_uptime_stat(from_date, to_date, detailing, operator_address)
+    result = container.validator_service.get_validator_uptime_stat(from_date, to_date, detailing, operator_address)
     return jsonify({'data': result, 'name': 'validator_uptime_stat'})
 
 
@@ -193,48 +222,52 @@ def fees_paid():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    result = StatisticsService().get_fees_paid(from_date, to_date, detailing)
+    result = container.statistics_service.get_fees_paid(from_date, to_date, detailing)
     return jsonify({'data': result, 'name': 'fees_paid'})
 
 
 @app.route('/statistics/fees_paid/actual')
+@conditional_on_height
 def fees_paid_actual():
-    result = StatisticsService().get_fees_paid_actual()
+    result = container.statistics_service.get_fees_paid_actual()
     return jsonify({'data': result, 'name': 'fees_paid_actual'})
 
 
 @app.route('/validators/<validator_address>')
 def validator(validator_address):
-    validator_service = ValidatorService()
+    validator_service = container.validator_service
     return jsonify(validator_service.get_validator_info(validator_address))
 
 
 @app.route('/distribution/staking_pool')
 def staking_pool():
-    distribution_service = DistributionService()
+    distribution_service = container.distribution_service
     return jsonify(distribution_service.get_staking_pool())
 
 
 @app.route('/statistics/active_proposals')
+@conditional_on_height
 def active_proposals():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_active_proposals_statistics(), 'name': 'active_proposals'})
 
 
 @app.route('/statistics/pending_proposals')
+@conditional_on_height
 def pending_proposals():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_pending_proposals_statistics(), 'name': 'pending_proposals'})
 
 @app.route('/statistics/last_block_height')
+@conditional_on_height
 def last_block_height():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_last_block_height(), 'name': 'last_block_height'})
 
 
 @app.route('/statistics/blocks_time')
 def blocks_time():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_blocks_time(), 'name': 'blocks_time'})
 
 @app.route('/statistics/blocks')
@@ -242,39 +275,42 @@ def blocks():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_blocks(from_date, to_date, detailing), 'name': 'blocks'})
 
 
 @app.route('/statistics/transactions_per_block')
+@conditional_on_height
 def transactions_per_block():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     limit = request.args.get('limit')
     offset = request.args.get('offset')
-    return jsonify({'data': statistics_service.get_transactions_per_block(limit, offset), 'name': 'transactions_per_block'})
+    cursor = request.args.get('cursor')
+    result = statistics_service.get_transactions_per_block(limit, offset, stream_requested(), cursor)
+    return jsonify_rows('data', result, cursor_key=('height',), name='transactions_per_block')
 
 
 @app.route('/statistics/active_validators')
 def active_validators():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_active_validators(), 'name': 'active_validators'})
 
 
 @app.route('/statistics/unbound_period')
 def unbound_period():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_unbound_period(), 'name': 'unbound_period'})
 
 
 @app.route('/statistics/market_cap')
 def market_cap():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_market_cap(), 'name': 'market_cap'})
 
 
 @app.route('/statistics/token_prices')
 def token_prices():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_token_prices(), 'name': 'token_prices'})
 
 
@@ -283,13 +319,14 @@ def total_supply():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_total_supply_by_days(from_date, to_date, detailing), 'name': 'total_supply'})
 
 
 @app.route('/statistics/total_supply/actual')
+@conditional_on_height
 def total_supply_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_total_supply_actual(), 'name': 'total_supply_actual'})
 
 
@@ -298,7 +335,7 @@ def bonded_tokens():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_bonded_tokens_by_days(from_date, to_date, detailing), 'name': 'bonded_atom'})
 
 
@@ -307,19 +344,21 @@ def unbonded_tokens():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_unbonded_tokens_by_days(from_date, to_date, detailing), 'name': 'unbonded_atom'})
 
 
 @app.route('/statistics/unbonded_tokens/actual')
+@conditional_on_height
 def unbonded_tokens_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_unbonded_tokens_actual(), 'name': 'unbonded_atom_actual'})
 
 
 @app.route('/statistics/bonded_tokens/actual')
+@conditional_on_height
 def bonded_tokens_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_bonded_tokens_actual(), 'name': 'bonded_atom_actual'})
 
 
@@ -328,13 +367,14 @@ def circulating_supply():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_circulating_supply_by_days(from_date, to_date, detailing), 'name': 'circulating_supply'})
 
 
 @app.route('/statistics/circulating_supply/actual')
+@conditional_on_height
 def circulating_supply_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_circulating_supply_actual(), 'name': 'circulating_supply_actual'})
 
 
@@ -343,13 +383,14 @@ def bonded_ratio():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_bonded_ratio_by_days(from_date, to_date, detailing), 'name': 'bonded_ratio'})
 
 
 @app.route('/statistics/bonded_ratio/actual')
+@conditional_on_height
 def bonded_ratio_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_bonded_ratio_actual(), 'name': 'bonded_ratio_actual'})
 
 
@@ -358,13 +399,14 @@ def community_pool():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_community_pool_by_days(from_date, to_date, detailing), 'name': 'community_pool'})
 
 
 @app.route('/statistics/community_pool/actual')
+@conditional_on_height
 def community_pool_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_community_pool_actual(), 'name': 'community_pool_actual'})
 
 
@@ -373,13 +415,14 @@ def inflation():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_inflation_by_days(from_date, to_date, detailing), 'name': 'inflation'})
 
 
 @app.route('/statistics/inflation/actual')
+@conditional_on_height
 def inflation_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_inflation_actual(), 'name': 'inflation_actual'})
 
 
@@ -388,7 +431,7 @@ def apr():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_apr_by_days(from_date, to_date, detailing), 'name': 'apr'})
 
 
@@ -397,19 +440,21 @@ def restake_execution_count():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_restake_execution_count(from_date, to_date, detailing), 'name': 'restake_execution_count'})
 
 
 @app.route('/statistics/restake_execution_count/actual')
+@conditional_on_height
 def restake_execution_count_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_restake_execution_count_actual(), 'name': 'restake_execution_count_actual'})
 
 
 @app.route('/statistics/apr/actual')
+@conditional_on_height
 def apr_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_apr_actual(), 'name': 'apr_actual'})
 
 
@@ -418,19 +463,21 @@ def apy():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_apy_by_days(from_date, to_date, detailing), 'name': 'apy'})
 
 
 @app.route('/statistics/apy/actual')
+@conditional_on_height
 def apy_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_apy_actual(), 'name': 'apy_actual'})
 
 
 @app.route('/statistics/total_accounts/actual')
+@conditional_on_height
 def total_accounts_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_total_accounts_actual(), 'name': 'total_accounts_actual'})
 
 # TODO: THINK ABOUT VIEW
@@ -439,31 +486,31 @@ def total_accounts():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_total_accounts(from_date, to_date, detailing), 'name': 'total_accounts'})
 
 
 @app.route('/statistics/popular_transactions')
 def popular_transactions():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_popular_transactions(), 'name': 'popular_transactions'})
 
 
 @app.route('/statistics/staked_statistics')
 def staked_statistics():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_staked_statistics(), 'name': 'staked_statistics'})
 
 
 @app.route('/statistics/wealth_distribution')
 def wealth_distribution():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_wealth_distribution(), 'name': 'wealth_distribution'})
 
 
 @app.route('/statistics/inactive_accounts')
 def inactive_accounts():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_inactive_accounts(), 'name': 'inactive_accounts'})
 
 
@@ -472,13 +519,14 @@ def new_accounts():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_new_accounts(from_date, to_date, detailing), 'name': 'new_accounts'})
 
 
 @app.route('/statistics/new_accounts/actual')
+@conditional_on_height
 def new_accounts_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_new_accounts_actual(), 'name': 'new_accounts_actual'})
 
 
@@ -487,13 +535,14 @@ def gas_paid():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_gas_paid(from_date, to_date, detailing), 'name': 'gas_paid'})
 
 
 @app.route('/statistics/gas_paid/actual')
+@conditional_on_height
 def gas_paid_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_gas_paid_actual(), 'name': 'gas_paid_actual'})
 
 
@@ -502,13 +551,14 @@ def transactions():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_transactions(from_date, to_date, detailing), 'name': 'transactions'})
 
 
 @app.route('/statistics/transactions/actual')
+@conditional_on_height
 def transactions_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_transactions_actual(), 'name': 'transactions_actual'})
 
 
@@ -517,7 +567,7 @@ def redelegation_message():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_redelegation_message(from_date, to_date, detailing), 'name': 'redelegation_message'})
 
 
@@ -526,7 +576,7 @@ def unbonding_message():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_unbonding_message(from_date, to_date, detailing), 'name': 'unbonding_message'})
 
 
@@ -535,7 +585,7 @@ def delegation_message():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_delegation_message(from_date, to_date, detailing), 'name': 'delegation_message'})
 
 
@@ -544,43 +594,44 @@ def active_accounts():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_active_accounts(from_date, to_date, detailing), 'name': 'active_accounts'})
 
 
 @app.route('/statistics/active_accounts/actual')
+@conditional_on_height
 def active_accounts_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_active_accounts_actual(), 'name': 'active_accounts_actual'})
 
 
 @app.route('/parameters/staking')
 def staking():
-    parameters_service = ParametersService()
+    parameters_service = container.parameters_service
     return jsonify(parameters_service.get_staking_params())
 
 
 @app.route('/parameters/mint')
 def mint():
-    parameters_service = ParametersService()
+    parameters_service = container.parameters_service
     return jsonify(parameters_service.get_mint_params())
 
 
 @app.route('/parameters/distribution')
 def distribution():
-    parameters_service = ParametersService()
+    parameters_service = container.parameters_service
     return jsonify(parameters_service.get_distribution_params())
 
 
 @app.route('/parameters/slash')
 def slash():
-    parameters_service = ParametersService()
+    parameters_service = container.parameters_service
     return jsonify(parameters_service.get_slash_params())
 
 
 @app.route('/parameters/gov')
 def gov():
-    parameters_service = ParametersService()
+    parameters_service = container.parameters_service
     return jsonify(parameters_service.get_gov_parameters())
 
 
@@ -589,37 +640,43 @@ def restake_token_amount():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_restake_token_amount(from_date, to_date, detailing), 'name': 'restake_token_amount'})
 
 
 @app.route('/statistics/restake_token_amount/actual')
+@conditional_on_height
 def restake_token_amount_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_restake_token_amount_actual(), 'name': 'restake_token_amount_actual'})
 
 @app.route('/statistics/whale_transactions')
 def whale_transactions():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     limit = request.args.get('limit')
     offset = request.args.get('offset')
-    return jsonify({'data': statistics_service.get_whale_transactions(limit, offset), 'name': 'whale_transactions'})
+    cursor = request.args.get('cursor')
+    result = statistics_service.get_whale_transactions(limit, offset, stream_requested(), cursor)
+    return jsonify_rows('data', result, cursor_key=('height', 'tx_hash', 'address', 'amount'), name='whale_transactions')
 
 
 @app.route('/statistics/staked_amount', methods=['POST'])
 def staked_amount():
     request_data = request.get_json()
     user_addresses = request_data.get('addresses', [])
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_user_bronbro_staking(user_addresses), 'name': 'staked_amount'})
 
 
 @app.route('/statistics/rich_list')
+@conditional_on_height
 def rich_list():
     limit = request.args.get('limit')
     offset = request.args.get('offset')
-    statistics_service = StatisticsService()
-    return jsonify({'data': statistics_service.get_rich_list(limit, offset), 'name': 'rich_list'})
+    statistics_service = container.statistics_service
+    cursor = request.args.get('cursor')
+    result = statistics_service.get_rich_list(limit, offset, stream_requested(), cursor)
+    return jsonify_rows('data', result, cursor_key=('sum', 'address'), name='rich_list')
 
 
 @app.route('/statistics/active_restake_users')
@@ -627,13 +684,14 @@ def active_restake_users():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_active_restake_users(from_date, to_date, detailing), 'name': 'active_restake_users'})
 
 
 @app.route('/statistics/active_restake_users/actual')
+@conditional_on_height
 def active_restake_users_actual():
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_active_restake_users_actual(), 'name': 'active_restake_users_actual'})
 
 
@@ -642,30 +700,64 @@ def inactive_accounts_historical():
     from_date = request.args.get('from_date')
     to_date = request.args.get('to_date')
     detailing = request.args.get('detailing')
-    statistics_service = StatisticsService()
+    statistics_service = container.statistics_service
     return jsonify({'data': statistics_service.get_inactive_accounts_historical(from_date, to_date, detailing), 'name': 'inactive_accounts'})
 
 
+@app.route('/metrics')
+def metrics():
+    return jsonify({
+        'price_oracle': price_oracle.get_metrics(),
+        'clickhouse_pool': DBConnector().get_metrics(),
+        'http': HttpConnector().get_metrics(),
+        'height_cache': height_cache.get_metrics(),
+    })
+
+
 @app.before_request
 def logging_before():
     # Store the start time for the request
     app_ctx.start_time = time.perf_counter()
 
 
+# after_request hooks run in reverse order of registration, this one has to see the final body
+@app.after_request
+def compress_large_responses(response):
+    return compress_response(response, request.accept_encodings)
+
+
 @app.after_request
 def add_network_and_response_time_to_response(response):
     total_time = time.perf_counter() - app_ctx.start_time
     time_in_ms = int(total_time * 1000)
     # Log the time taken for the endpoint
     app.logger.info(f'Response time: {time_in_ms}, path: {request.path}')
-    data = response.json
-    if data:
-        data['network'] = NETWORK
-        data['response_time'] = time_in_ms
-        response.data = json.dumps(data)
+    timings = get_timings()
+    if timings:
+        response.headers['Server-Timing'] = ', '.join(f'{name};dur={duration * 1000:.1f}' for name, duration in timings.items())
+    if isinstance(response, StreamedPayloadResponse):
+        # the envelope is written after the last row so the response time covers the whole stream,
+        # the rows are never in memory at once to be hashed for an ETag
+        response.envelope['network'] = NETWORK
+        response.started_at = app_ctx.start_time
+        return response
+    if response.status_code == 304 or not isinstance(response, PayloadResponse):
+        return response
+    # the only time the data is encoded, the envelope is spliced into the encoded body afterwards
+    body = response.encode()
+    if response.status_code == 200 and not response.get_etag()[0]:
+        # history and other data without a known source height are tagged with a hash of their content
+        response.set_etag(response.payload_digest, weak=True)
+    response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+    if response.payload and isinstance(response.payload, dict):
+        response.set_data(add_fields(body, {'network': NETWORK, 'response_time': time_in_ms}))
     return response
 
-
 if __name__ == '__main__':
-    app.register_blueprint(swaggerui_blueprint)
-    app.run(host=API_HOST, port=API_PORT)
+    # Development server only, production runs through gunicorn (see gunicorn.conf.py)
+    try:
+        app.run(host=API_HOST, port=API_PORT)
+    finally:
+        save_snapshot()
@@ -1,4 +1,3 @@
-import asyncio
 import datetime
 import json
 from typing import Optional, List
@@ -8,8 +7,9 @@ import dateutil.parser
 
 from clients.db_client import DBClient
 from clients.bronbro_api_client import BronbroApiClient
+from common.concurrency import run_parallel
 from common.constants import TOKENS_STARTED_FROM_U
-from config.config import STAKED_DENOM, MINTSCAN_AVATAR_URL
+from config.settings import STAKED_DENOM, MINTSCAN_AVATAR_URL
 from services.balance_prettifier import BalancePrettifierService
 
 
@@ -29,19 +29,7 @@ class AccountService:
                     'denom': account_balance.coins.get('denom')[i],
                     'amount': account_balance.coins.get('amount')[i],
                 })
-            prettified_result = self.balance_prettifier_service.prettify_balance_structure(result)
-            result_with_prices = self.balance_prettifier_service.add_additional_fields_to_balance(prettified_result)
-            result_with_logos = self.balance_prettifier_service.add_logo_to_balance_items(result_with_prices)
-            result = {
-                'native': [],
-                'ibc': []
-            }
-            for balance_item in result_with_logos:
-                if balance_item.get('denom') == STAKED_DENOM:
-                    result['native'].append(balance_item)
-                else:
-                    result['ibc'].append(balance_item)
-            return result
+            return self.split_liquid_balance(self.balance_prettifier_service.enrich_balance_items(result))
         else:
             return None
 
@@ -49,10 +37,7 @@ class AccountService:
         staked_balance = self.db_client.get_stacked_balance_for_address(address)
         if staked_balance:
             result = [{'denom': item.denom, 'amount': item.amount} for item in staked_balance]
-            prettified_result = self.balance_prettifier_service.prettify_balance_structure(result)
-            result_with_prices = self.balance_prettifier_service.add_additional_fields_to_balance(prettified_result)
-            result_with_logos = self.balance_prettifier_service.add_logo_to_balance_items(result_with_prices)
-            return result_with_logos
+            return self.balance_prettifier_service.enrich_balance_items(result)
         else:
             return None
 
@@ -60,10 +45,7 @@ class AccountService:
         unbonding_balance = self.db_client.get_unbonding_balance_for_address(address)
         if unbonding_balance:
             result = [{'denom': item.coin_denom, 'amount': item.sum_coin_amount_} for item in unbonding_balance]
-            prettified_result = self.balance_prettifier_service.prettify_balance_structure(result)
-            result_with_prices = self.balance_prettifier_service.add_additional_fields_to_balance(prettified_result)
-            result_with_logos = self.balance_prettifier_service.add_logo_to_balance_items(result_with_prices)
-            return result_with_logos
+            return self.balance_prettifier_service.enrich_balance_items(result)
         else:
             return None
 
@@ -73,10 +55,7 @@ class AccountService:
             result = api_response.get('total')
             for balance_item in result:
                 balance_item['amount'] = float(balance_item['amount'])
-            prettified_result = self.balance_prettifier_service.prettify_balance_structure(result)
-            result_with_prices = self.balance_prettifier_service.add_additional_fields_to_balance(prettified_result)
-            result_with_logos = self.balance_prettifier_service.add_logo_to_balance_items(result_with_prices)
-            return result_with_logos
+            return self.balance_prettifier_service.enrich_balance_items(result)
         else:
             return None
 
@@ -89,24 +68,13 @@ class AccountService:
         }
         return account_balance
 
+    # the serializers return plain balance items, get_account_balance_2 enriches all of them at once
     def serialize_liquid_balance(self, liquid_response):
         if liquid_response and len(liquid_response.get('balances', [])):
             balance_items = liquid_response.get('balances')
             for balance_item in balance_items:
                 balance_item['amount'] = float(balance_item['amount'])
-            prettified_result = self.balance_prettifier_service.prettify_balance_structure(balance_items)
-            result_with_prices = self.balance_prettifier_service.add_additional_fields_to_balance(prettified_result)
-            result_with_logos = self.balance_prettifier_service.add_logo_to_balance_items(result_with_prices)
-            result = {
-                'native': [],
-                'ibc': []
-            }
-            for balance_item in result_with_logos:
-                if balance_item.get('denom') == STAKED_DENOM:
-                    result['native'].append(balance_item)
-                else:
-                    result['ibc'].append(balance_item)
-            return result
+            return balance_items
         else:
             return None
 
@@ -126,10 +94,7 @@ class AccountService:
                         })
                     else:
                         result[already_added_denoms.index(current_denom)]['amount'] += float(delegation.get('balance').get('amount'))
-            prettified_result = self.balance_prettifier_service.prettify_balance_structure(result)
-            result_with_prices = self.balance_prettifier_service.add_additional_fields_to_balance(prettified_result)
-            result_with_logos = self.balance_prettifier_service.add_logo_to_balance_items(result_with_prices)
-            return result_with_logos
+            return result
         else:
             return None
 
@@ -142,14 +107,10 @@ class AccountService:
                     if dateutil.parser.parse(entry.get('completion_time')).timestamp() > current_time:
                         total_unbonding += int(entry.get('balance'))
             if total_unbonding > 0:
-                result = [{
+                return [{
                     'amount': total_unbonding,
                     'denom': STAKED_DENOM
                 }]
-                prettified_result = self.balance_prettifier_service.prettify_balance_structure(result)
-                result_with_prices = self.balance_prettifier_service.add_additional_fields_to_balance(prettified_result)
-                result_with_logos = self.balance_prettifier_service.add_logo_to_balance_items(result_with_prices)
-                return result_with_logos
             else:
                 return None
         else:
@@ -160,13 +121,22 @@ class AccountService:
             result = liquid_response.get('total')
             for balance_item in result:
                 balance_item['amount'] = float(balance_item['amount'])
-            prettified_result = self.balance_prettifier_service.prettify_balance_structure(result)
-            result_with_prices = self.balance_prettifier_service.add_additional_fields_to_balance(prettified_result)
-            result_with_logos = self.balance_prettifier_service.add_logo_to_balance_items(result_with_prices)
-            return result_with_logos
+            return result
         else:
             return None
 
+    def split_liquid_balance(self, balance_items: List[dict]) -> dict:
+        result = {
+            'native': [],
+            'ibc': []
+        }
+        for balance_item in balance_items:
+            if balance_item.get('denom') == STAKED_DENOM:
+                result['native'].append(balance_item)
+            else:
+                result['ibc'].append(balance_item)
+        return result
+
     def balance_items_mappers(self, item_type):
         mapper = {
             'liquid': self.serialize_liquid_balance,
@@ -177,12 +147,16 @@ class AccountService:
         return mapper.get(item_type)
 
     def get_account_balance_2(self, address: str) -> dict:
-        balances_responses = asyncio.run(self.bronbro_api_client.get_account_balances(address))
+        balances_responses = self.bronbro_api_client.run(self.bronbro_api_client.get_account_balances(address))
         result = {}
         for balance_response in balances_responses:
             type = balance_response.get('type')
             serializer = self.balance_items_mappers(type)
             result[type] = serializer(balance_response['response'])
+        # denoms and logos of all four categories are looked up in one batch each
+        self.balance_prettifier_service.enrich_balance_items([item for items in result.values() if items for item in items])
+        if result.get('liquid'):
+            result['liquid'] = self.split_liquid_balance(result['liquid'])
         return result
 
     def get_annual_provision(self) -> int:
@@ -202,18 +176,27 @@ class AccountService:
         return result
 
     def get_account_info(self, address) -> dict:
-        account_staked_balance = self.get_account_staked_balance(address)
-        validators = self.get_validators(address)
+        # none of the lookups depends on another, ClickHouse queries and HTTP calls overlap
+        results = run_parallel({
+            'staked_balance': lambda: self.get_account_staked_balance(address),
+            'validators': lambda: self.get_validators(address),
+            'annual_provision': self.get_annual_provision,
+            'community_tax': self.get_community_tax,
+            'bonded_tokens_amount': self.get_bonded_tokens_amount,
+            'staked_denom_info': lambda: self.balance_prettifier_service.get_and_build_token_info(STAKED_DENOM),
+        })
+        account_staked_balance = results['staked_balance']
+        validators = results['validators']
         if account_staked_balance:
             delegations_sum = next((balance.get('amount') for balance in account_staked_balance if balance.get('denom') == STAKED_DENOM), 0)
         else:
             delegations_sum = 0
-        annual_provision = self.get_annual_provision()
-        community_tax = self.get_community_tax()
-        bonded_tokens_amount = self.get_bonded_tokens_amount()
+        annual_provision = results['annual_provision']
+        community_tax = results['community_tax']
+        bonded_tokens_amount = results['bonded_tokens_amount']
         apr = annual_provision * (1 - community_tax) / bonded_tokens_amount
         total_annual_provision = sum([x['coin']['amount'] * apr * (1 - x['commission']) for x in validators])
-        staked_denom_info = self.balance_prettifier_service.get_and_build_token_info(STAKED_DENOM)
+        staked_denom_info = results['staked_denom_info']
         return {
             "apr": apr,
             "voting_power": delegations_sum / bonded_tokens_amount,
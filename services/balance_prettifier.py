@@ -1,4 +1,3 @@
-import asyncio
 from typing import List
 
 from clients.bronbro_api_client import BronbroApiClient
@@ -6,37 +5,27 @@ from clients.db_client import DBClient
 from common.constants import TOKENS_STARTED_FROM_U
 from common.in_memory_cache import set_cached_denoms, CACHED_SYMBOLS, CACHED_LOGOS, set_cached_logos, \
     get_denom_to_search_in_api
+from common.price_oracle import price_oracle
 
 
 class BalancePrettifierService:
     def __init__(self):
         self.db_client = DBClient()
         self.bronbro_api_client = BronbroApiClient()
-        self.exchange_rates = self.set_exchange_rates()
-
-    def set_exchange_rates(self):
-        result = {}
-        exchange_rates = self.bronbro_api_client.get_exchange_rates()
-        for exchange_rate in exchange_rates:
-            result[exchange_rate.get('symbol').lower()] = {
-                'price': exchange_rate.get('price'),
-                'exponent': exchange_rate.get('exponent'),
-                'symbol': exchange_rate.get('symbol'),
-            }
-        return result
 
     def prettify_balance_structure(self, balance: List[dict]) -> List[dict]:
         denoms_to_prettify = [item['denom'] for item in balance if item['denom'].startswith('ibc/') and item['denom'] not in CACHED_SYMBOLS]
-        mapped_denoms = asyncio.run(self.bronbro_api_client.get_symbols_from_denoms(denoms_to_prettify))
-        set_cached_denoms(mapped_denoms)
+        if denoms_to_prettify:
+            mapped_denoms = self.bronbro_api_client.run(self.bronbro_api_client.get_symbols_from_denoms(denoms_to_prettify))
+            set_cached_denoms(mapped_denoms)
         for item in balance:
             if item['denom'].startswith('ibc/'):
-                item['denom'] = CACHED_SYMBOLS[item['denom']]
+                item['denom'] = CACHED_SYMBOLS.get(item['denom']) or item['denom']
         return balance
 
     def add_additional_fields_to_balance_item(self, balance_item: dict) -> dict:
         denom_to_search = get_denom_to_search_in_api(balance_item['denom'])
-        exchange_rate = self.exchange_rates.get(denom_to_search, None)
+        exchange_rate = price_oracle.get_rate_for_denom(denom_to_search)
         balance_item['price'] = exchange_rate.get('price') if exchange_rate else 0
         balance_item['exponent'] = exchange_rate.get('exponent') if exchange_rate else 0
         balance_item['symbol'] = exchange_rate.get('symbol') if exchange_rate else balance_item['denom']
@@ -51,23 +40,31 @@ class BalancePrettifierService:
         symbols = []
         for balance_item in balance:
             denom_to_search = get_denom_to_search_in_api(balance_item['denom'])
-            if not CACHED_LOGOS.get(denom_to_search):
+            # tokens known to have no logo are cached too, with an empty logo
+            if denom_to_search not in CACHED_LOGOS and denom_to_search not in symbols:
                 symbols.append(denom_to_search)
-        symbols_with_logos = asyncio.run(self.bronbro_api_client.get_symbols_logos(symbols))
-        set_cached_logos(symbols_with_logos)
+        if symbols:
+            symbols_with_logos = self.bronbro_api_client.run(self.bronbro_api_client.get_symbols_logos(symbols))
+            set_cached_logos(symbols_with_logos)
         for item in balance:
             item['logo'] = CACHED_LOGOS.get(get_denom_to_search_in_api(item['denom']), '')
         return balance
 
+    def enrich_balance_items(self, balance: List[dict]) -> List[dict]:
+        """
+        Resolves IBC denoms, adds prices and logos in place. Items of several balances can be passed
+        in one list so their denoms and logos are looked up in one batch each.
+        """
+        self.prettify_balance_structure(balance)
+        self.add_additional_fields_to_balance(balance)
+        self.add_logo_to_balance_items(balance)
+        return balance
+
     def get_and_build_token_info(self, token):
         token_info = {
             'denom': token,
         }
         token_info = self.add_additional_fields_to_balance_item(token_info)
-        token_to_get_logo = get_denom_to_search_in_api(token_info['denom'])
-        logo_response = self.bronbro_api_client.get_token_logo(token_to_get_logo)
-        token_info['logo'] = logo_response.get('logo_URIs', {}).get('svg', '') if logo_response else ''
+        # the logo comes from the shared logo cache
+        self.add_logo_to_balance_items([token_info])
         return token_info
-
-    def clean_cache_after_request(self):
-        self.exchange_rates = {}
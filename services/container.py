@@ -0,0 +1,43 @@
+from functools import cached_property
+
+from services.account import AccountService
+from services.distribution import DistributionService
+from services.parameters import ParametersService
+from services.proposal import ProposalService
+from services.statistics import StatisticsService
+from services.validator import ValidatorService
+
+
+class ServiceContainer:
+    """
+    Builds every service once per worker process, on first use, and hands the same
+    instances to all requests. Services are shared between request threads, so they
+    must not keep request data on `self`.
+    """
+
+    @cached_property
+    def account_service(self) -> AccountService:
+        return AccountService()
+
+    @cached_property
+    def distribution_service(self) -> DistributionService:
+        return DistributionService()
+
+    @cached_property
+    def parameters_service(self) -> ParametersService:
+        return ParametersService()
+
+    @cached_property
+    def proposal_service(self) -> ProposalService:
+        return ProposalService()
+
+    @cached_property
+    def statistics_service(self) -> StatisticsService:
+        return StatisticsService()
+
+    @cached_property
+    def validator_service(self) -> ValidatorService:
+        return ValidatorService()
+
+
+container = ServiceContainer()
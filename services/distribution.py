@@ -1,6 +1,6 @@
 from clients.bronbro_api_client import BronbroApiClient
 from clients.db_client import DBClient
-from config.config import STAKED_DENOM
+from config.settings import STAKED_DENOM
 from services.balance_prettifier import BalancePrettifierService
 
 
@@ -4,7 +4,9 @@ from typing import Optional, List
 
 from clients.bronbro_api_client import BronbroApiClient
 from clients.db_client import DBClient
-from config.config import MINTSCAN_AVATAR_URL
+from common.joins import group_by, index_by
+from common.streaming import map_blocks
+from config.settings import MINTSCAN_AVATAR_URL
 from services.balance_prettifier import BalancePrettifierService
 
 
@@ -21,33 +23,42 @@ class ProposalService:
         self.DID_NOT_VOTE = 'DID_NOT_VOTE'
         self.WEIGHTED_VOTE = 'WEIGHTED_VOTE'
 
-    def get_proposals(self, limit: Optional[int], offset: Optional[int], query_params) -> List[dict]:
+    def get_proposals(self, limit: Optional[int], offset: Optional[int], query_params, stream: bool = False,
+                      cursor: Optional[str] = None) -> List[dict]:
+        return map_blocks(self.db_client.get_proposals(limit, offset, query_params, stream, cursor), self.format_proposals)
+
+    def format_proposals(self, proposals: List[namedtuple]) -> List[dict]:
         result = []
-        proposals = self.db_client.get_proposals(limit, offset, query_params)
         if not proposals:
             return []
         proposals_ids = [str(proposal.id) for proposal in proposals]
-        proposals_deposits = self.db_client.get_proposals_deposits(proposals_ids)
+        proposals_deposits = {
+            proposal_id: self.parse_proposal_deposits(deposits)
+            for proposal_id, deposits in group_by(self.db_client.get_proposals_deposits(proposals_ids), 'proposal_id').items()
+        }
+        # coins of every deposit on the page, or in the block when streamed, are enriched together
+        self.balance_prettifier_service.enrich_balance_items(
+            [coin for deposits in proposals_deposits.values() for deposit in deposits for coin in deposit['coins']])
         for proposal in proposals:
-            proposal_deposits = [item for item in proposals_deposits if item.proposal_id == proposal.id]
-            prettified_deposits = self.format_proposal_deposits(proposal_deposits)
             proposal = proposal._asdict()
-            proposal['depositors'] = prettified_deposits
+            proposal['depositors'] = proposals_deposits.get(proposal['id'], [])
             result.append(proposal)
         return result
 
-    def format_proposal_deposits(self, deposits: List[namedtuple]):
+    def parse_proposal_deposits(self, deposits: List[namedtuple]) -> List[dict]:
         result = []
         for deposit in deposits:
             deposit = deposit._asdict()
             deposit.pop('proposal_id')
-            prettified_result = self.balance_prettifier_service.prettify_balance_structure(json.loads(deposit.get('coins')))
-            result_with_prices = self.balance_prettifier_service.add_additional_fields_to_balance(prettified_result)
-            result_with_logos = self.balance_prettifier_service.add_logo_to_balance_items(result_with_prices)
-            deposit['coins'] = result_with_logos
+            deposit['coins'] = json.loads(deposit.get('coins'))
             result.append(deposit)
         return result
 
+    def format_proposal_deposits(self, deposits: List[namedtuple]):
+        result = self.parse_proposal_deposits(deposits)
+        self.balance_prettifier_service.enrich_balance_items([coin for deposit in result for coin in deposit['coins']])
+        return result
+
     def get_proposal(self, id: int) -> dict:
         proposal = self.db_client.get_proposal(id)
         if proposal:
@@ -60,23 +71,26 @@ class ProposalService:
         else:
             return {}
 
-    def get_votes(self, limit: Optional[int], offset: Optional[int], order_by: Optional[str]):
+    def get_votes(self, limit: Optional[int], offset: Optional[int], order_by: Optional[str], cursor: Optional[str] = None):
         total = self.db_client.get_count_of_proposals_with_votes().result
-        proposals = self.db_client.get_proposals_ids_with_votes(limit, offset, order_by)
+        proposals = self.db_client.get_proposals_ids_with_votes(limit, offset, order_by, cursor)
+        if not proposals:
+            return [], total
         proposals_ids = [str(proposal.proposal_id) for proposal in proposals]
-        proposals_shares_votes = self.db_client.get_shares_votes(proposals_ids)
-        proposals_amount_votes = self.db_client.get_amount_votes(proposals_ids)
-        proposals_info = self.db_client.get_proposals_end_time_and_status(proposals_ids)
+        proposals_shares_votes = index_by(self.db_client.get_shares_votes(proposals_ids), 'proposal_id')
+        proposals_amount_votes = index_by(self.db_client.get_amount_votes(proposals_ids), 'proposal_id')
+        proposals_info = index_by(self.db_client.get_proposals_end_time_and_status(proposals_ids), 'id')
         result = []
         for proposal in proposals:
-            proposal_end_time_and_status = next((item for item in proposals_info if item.id==proposal.proposal_id), None)
-            shares_values = next((shares_votes for shares_votes in proposals_shares_votes if shares_votes.proposal_id == proposal.proposal_id), None)
+            proposal_end_time_and_status = proposals_info.get(proposal.proposal_id)
+            shares_values = proposals_shares_votes.get(proposal.proposal_id)
+            amount_votes = proposals_amount_votes.get(proposal.proposal_id)
             proposal_info = {
                 'id': proposal.proposal_id,
-                'amount_option_yes': next((amount_vote.count__ for amount_vote in proposals_amount_votes if amount_vote.proposal_id==proposal.proposal_id and amount_vote.option == self.VOTE_OPTION_YES), 0),
-                'amount_option_no': next((amount_vote.count__ for amount_vote in proposals_amount_votes if amount_vote.proposal_id==proposal.proposal_id and amount_vote.option == self.VOTE_OPTION_NO), 0),
-                'amount_option_abstain': next((amount_vote.count__ for amount_vote in proposals_amount_votes if amount_vote.proposal_id==proposal.proposal_id and amount_vote.option == self.VOTE_OPTION_ABSTAIN), 0),
-                'amount_option_nwv': next((amount_vote.count__ for amount_vote in proposals_amount_votes if amount_vote.proposal_id==proposal.proposal_id and amount_vote.option == self.VOTE_OPTION_NO_WITH_VETO), 0),
+                'amount_option_yes': amount_votes.yes if amount_votes else 0,
+                'amount_option_no': amount_votes.no if amount_votes else 0,
+                'amount_option_abstain': amount_votes.abstain if amount_votes else 0,
+                'amount_option_nwv': amount_votes.no_with_veto if amount_votes else 0,
                 'shares_option_yes': shares_values.yes if shares_values else 0,
                 'shares_option_no': shares_values.no if shares_values else 0,
                 'shares_option_abstain': shares_values.abstain if shares_values else 0,
@@ -114,10 +128,11 @@ class ProposalService:
 
     def build_validator_info_for_proposal(self, validator_info, delegators_info, validator_address=None, validator_self_delegation=None):
         result = validator_info._asdict() if validator_info else self.build_empty_validator_answer(validator_address)
-        no_vote = next((delegator for delegator in delegators_info if delegator.option == self.VOTE_OPTION_NO), None)
-        no_with_veto_vote = next((delegator for delegator in delegators_info if delegator.option == self.VOTE_OPTION_NO_WITH_VETO), None)
-        abstain_vote = next((delegator for delegator in delegators_info if delegator.option == self.VOTE_OPTION_ABSTAIN), None)
-        yes_vote = next((delegator for delegator in delegators_info if delegator.option == self.VOTE_OPTION_YES), None)
+        votes = index_by(delegators_info, 'option', first=True)
+        no_vote = votes.get(self.VOTE_OPTION_NO)
+        no_with_veto_vote = votes.get(self.VOTE_OPTION_NO_WITH_VETO)
+        abstain_vote = votes.get(self.VOTE_OPTION_ABSTAIN)
+        yes_vote = votes.get(self.VOTE_OPTION_YES)
 
         validator_option = {}
         if validator_info and validator_self_delegation:
@@ -182,21 +197,17 @@ class ProposalService:
         return result
 
     def get_delegators_votes_info_for_proposal(self, proposal_id, validator_option):
+        if validator_option and validator_option not in [self.VOTE_OPTION_YES, self.VOTE_OPTION_NO, self.VOTE_OPTION_ABSTAIN,
+                                                         self.VOTE_OPTION_NO_WITH_VETO, self.WEIGHTED_VOTE]:
+            return []
         result = []
-        delegators_votes_info = self.db_client.get_validators_delegators_votes_info_for_proposal(proposal_id)
-        validators_specific_info = self.db_client.get_validators_proposal_votes_with_additional_info(proposal_id)
-        if validator_option:
-            if validator_option == self.WEIGHTED_VOTE:
-                validators_specific_info = [validator for validator in validators_specific_info if
-                                            validator.validator_option and validator.validator_option not in
-                                            [self.VOTE_OPTION_NO, self.VOTE_OPTION_YES,self.VOTE_OPTION_NO_WITH_VETO,self.VOTE_OPTION_ABSTAIN]]
-            else:
-                validators_specific_info = [validator for validator in validators_specific_info if
-                                            validator.validator_option == validator_option]
-        validators_self_delegations = self.db_client.get_validators_delegations()
+        delegators_votes_info = group_by(self.db_client.get_validators_delegators_votes_info_for_proposal(proposal_id), 'operator_address')
+        validators_specific_info = self.db_client.get_validators_proposal_votes_with_additional_info(proposal_id, validator_option=validator_option)
+        # rows come newest first, keep the latest delegation of every validator
+        validators_self_delegations = index_by(self.db_client.get_validators_delegations(), ('delegator_address', 'operator_address'), first=True)
         for validator in validators_specific_info:
-            validator_self_delegation = next((self_delegation for self_delegation in validators_self_delegations if self_delegation.delegator_address == validator.self_delegate_address and self_delegation.operator_address == validator.operator_address), None)
-            validator_delegators = [delegator for delegator in delegators_votes_info if delegator.operator_address == validator.operator_address]
+            validator_self_delegation = validators_self_delegations.get((validator.self_delegate_address, validator.operator_address))
+            validator_delegators = delegators_votes_info.get(validator.operator_address, [])
             if validator_delegators or validator.validator_option:
                 validator_response = self.build_validator_info_for_proposal(validator, validator_delegators, validator_self_delegation=validator_self_delegation)
                 result.append(validator_response)
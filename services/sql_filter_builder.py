@@ -3,7 +3,7 @@ class SqlFilterBuilderService:
     def build_filter(self, query_params):
         filter = ''
         for query_param in query_params.keys():
-            if query_param in ['offset', 'limit']:
+            if query_param in ['offset', 'limit', 'stream', 'cursor']:
                 continue
             param_key = query_param.split('__')[1]
             field_name = query_param.split('__')[0]
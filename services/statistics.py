@@ -1,13 +1,18 @@
 import json
 import math
 
-from clients.bronbro_api_client import BronbroApiClient
+import numpy as np
+
 from clients.db_client import DBClient
 from datetime import date, timedelta
 
 from clients.db_client_views import DBClientViews
 from common.constants import SECONDS_IN_YEAR, NANOSECONDS_IN_DAY
 from common.decorators import history_statistics_handler_for_view, history_statistics_handler
+from common.height_cache import cached_by_height
+from common.price_oracle import price_oracle
+from common.series import Series
+from common.streaming import map_blocks
 
 
 class StatisticsService:
@@ -15,7 +20,6 @@ class StatisticsService:
     def __init__(self):
         self.db_client = DBClient()
         self.db_client_views = DBClientViews()
-        self.bronbro_api_client = BronbroApiClient()
 
     def get_pending_proposals_statistics(self):
         return self.db_client.get_count_of_pending_proposals().count__
@@ -38,9 +42,12 @@ class StatisticsService:
             'blocks': [block._asdict() for block in blocks_info]
         }
 
-    def get_transactions_per_block(self, limit, offset):
-        transactions_per_block = self.db_client.get_transactions_per_block(limit, offset)
-        return [{'height': block.height, 'num_txs': block.num_txs, 'timestamp': str(block.timestamp), 'total_gas': block.total_gas} for block in transactions_per_block]
+    def get_transactions_per_block(self, limit, offset, stream=False, cursor=None):
+        transactions_per_block = self.db_client.get_transactions_per_block(limit, offset, stream, cursor)
+        return map_blocks(transactions_per_block, lambda blocks: [
+            {'height': block.height, 'num_txs': block.num_txs, 'timestamp': str(block.timestamp), 'total_gas': block.total_gas}
+            for block in blocks
+        ])
 
     def get_active_validators(self):
         result = self.db_client.get_actual_staking_param('max_validators')
@@ -52,8 +59,7 @@ class StatisticsService:
 
 
     def get_token_prices(self):
-        exchange_rates = self.bronbro_api_client.get_exchange_rates()
-        atom_exchange_rate = next((rate for rate in exchange_rates if rate.get('symbol') == 'ATOM'), None)
+        atom_exchange_rate = price_oracle.get_rate('ATOM')
         if not atom_exchange_rate:
             return {}
         prices = {
@@ -64,8 +70,7 @@ class StatisticsService:
         return prices
 
     def get_token_current_price(self):
-        exchange_rates = self.bronbro_api_client.get_exchange_rates()
-        return next((rate for rate in exchange_rates if rate.get('symbol') == 'ATOM'), None)
+        return price_oracle.get_rate('ATOM')
 
     def get_market_cap(self):
         market_cap = self.get_circulating_supply_actual()
@@ -96,11 +101,13 @@ class StatisticsService:
     def get_fees_paid(self, from_date, to_date, detailing):
         return self.db_client_views.get_fees_paid(from_date, to_date, detailing)
 
+    @cached_by_height
     def get_fees_paid_actual(self):
         today = str(date.today())
         height_from = self.db_client.get_min_date_height(today).height
         return self.db_client.get_fees_paid_actual(height_from).value
 
+    @cached_by_height
     def get_total_supply_actual(self):
         total_supply = self.db_client.get_total_supply_actual()
         return total_supply.amount if total_supply else None
@@ -113,9 +120,11 @@ class StatisticsService:
     def get_unbonded_tokens_by_days(self, from_date, to_date, detailing):
         return self.db_client_views.get_unbonded_tokens(from_date, to_date, detailing)
 
+    @cached_by_height
     def get_unbonded_tokens_actual(self):
         return self.db_client.get_actual_staking_pool().not_bonded_tokens
 
+    @cached_by_height
     def get_bonded_tokens_actual(self):
         return self.db_client.get_actual_staking_pool().bonded_tokens
 
@@ -127,6 +136,7 @@ class StatisticsService:
     # def get_circulating_supply_by_days(self, from_date, to_date, detailing):
     #     return self.db_client_views.get_circulating_supply(from_date, to_date, detailing)
 
+    @cached_by_height
     def get_circulating_supply_actual(self):
         return self.get_total_supply_actual() - self.get_community_pool_actual()
 
@@ -134,6 +144,7 @@ class StatisticsService:
     def get_bonded_ratio_by_days(self, from_date, to_date, detailing):
         return self.db_client_views.get_bonded_ratio(from_date, to_date, detailing)
 
+    @cached_by_height
     def get_bonded_ratio_actual(self):
         return self.db_client.get_actual_annual_provision().bonded_ratio
 
@@ -141,6 +152,7 @@ class StatisticsService:
     def get_community_pool_by_days(self, from_date, to_date, detailing):
         return self.db_client_views.get_community_pool(from_date, to_date, detailing)
 
+    @cached_by_height
     def get_community_pool_actual(self):
         coins = json.loads(self.db_client.get_community_pool_actual().coins)
         return float(coins[-1].get('amount'))
@@ -149,6 +161,7 @@ class StatisticsService:
     def get_inflation_by_days(self, from_date, to_date, detailing):
         return self.db_client_views.get_inflation(from_date, to_date, detailing)
 
+    @cached_by_height
     def get_inflation_actual(self):
         return self.db_client.get_actual_annual_provision().inflation
 
@@ -168,17 +181,13 @@ class StatisticsService:
         avg_block_lifetime = self.convert_date_diff_in_seconds(block_timestamp_latest - block_timestamp_20000_before)/20000
         real_blocks_per_year = SECONDS_IN_YEAR / avg_block_lifetime
         correction_annual_coefficient = real_blocks_per_year / expected_blocks_per_year
-        result = []
-        for index, annual_provision_in_day in enumerate(annual_provision_by_days):
-            bonded_tokens_in_this_day = bonded_tokens_by_days[index]
-            if bonded_tokens_in_this_day:
-                apr = (annual_provision_in_day.y * (1 - community_tax) / bonded_tokens_in_this_day.y) * correction_annual_coefficient
-                result.append({
-                    'x': str(annual_provision_in_day.x),
-                    'y': apr
-                })
-        return result
+        x, annual_provisions, bonded_tokens = annual_provision_by_days.align(bonded_tokens_by_days)
+        # buckets without bonded tokens give nan or inf, written as null
+        with np.errstate(divide='ignore', invalid='ignore'):
+            apr = annual_provisions * (1 - community_tax) / bonded_tokens * correction_annual_coefficient
+        return Series(x, apr)
 
+    @cached_by_height
     def get_apr_actual(self):
         bonded_tokens = self.db_client.get_actual_staking_pool().bonded_tokens
         annual_provision = self.db_client.get_actual_annual_provision().annual_provisions
@@ -195,34 +204,22 @@ class StatisticsService:
 
     def get_apy_by_days(self, from_date, to_date, detailing):
         apr_by_days = self.get_apr_by_days(from_date, to_date, detailing)
-        result = []
-        for item in apr_by_days:
-            apy = (1 + item.get('y')/365)**365 - 1
-            result.append({
-                'x': item.get('x'),
-                'y': apy
-            })
-        return result
+        return Series(apr_by_days.x, (1 + apr_by_days.y / 365) ** 365 - 1)
 
+    @cached_by_height
     def get_apy_actual(self):
         apr = self.get_apr_actual()
         return (1 + apr/365)**365 - 1
 
+    @cached_by_height
     def get_total_accounts_actual(self):
         return self.db_client.get_total_accounts_actual().total_value
 
     def get_total_accounts(self, from_date, to_date, detailing):
         new_accounts = self.get_new_accounts(from_date, to_date, detailing)
         height_before = self.db_client.get_min_date_height(from_date).height
-        accounts_before_count = self.db_client = self.db_client.get_total_accounts_before_height(height_before).total_value
-        result = []
-        for item in new_accounts:
-            amount_to_add = result[-1]['y'] if len(result) else accounts_before_count
-            result.append({
-                'x': item['x'],
-                'y': item['y'] + amount_to_add
-            })
-        return result
+        accounts_before_count = self.db_client.get_total_accounts_before_height(height_before).total_value
+        return Series(new_accounts.x, accounts_before_count + np.cumsum(new_accounts.y))
 
     def get_popular_transactions(self):
         result = self.db_client.get_popular_transactions_for_last_30_days()
@@ -275,6 +272,7 @@ class StatisticsService:
     def get_active_restake_users(self, from_date, to_date, detailing):
         return self.db_client_views.get_active_restake_users(from_date, to_date, detailing)
 
+    @cached_by_height
     def get_active_restake_users_actual(self):
         result = self.db_client_views.get_active_restake_users_actual()
         return result.result if result else 0
@@ -283,22 +281,27 @@ class StatisticsService:
     def get_inactive_accounts_historical(self, from_date, to_date, detailing):
         return self.db_client_views.get_inactive_accounts(from_date, to_date, detailing)
 
+    @cached_by_height
     def get_restake_token_amount_actual(self):
         today = str(date.today())
         height_from = self.db_client.get_min_date_height(today).height
         return self.db_client.get_restake_token_amount_actual(height_from).value
 
+    @cached_by_height
     def get_active_accounts_actual(self):
         today = str(date.today())
         height_from = self.db_client.get_min_date_height(today).height
         return self.db_client.get_active_accounts_actual(height_from).value
 
+    @cached_by_height
     def get_new_accounts_actual(self):
         return self.db_client_views.get_new_accounts_without_state_actual().result
 
+    @cached_by_height
     def get_gas_paid_actual(self):
         return self.db_client.get_gas_paid_actual().value
 
+    @cached_by_height
     def get_transactions_actual(self):
         return self.db_client.get_transactions_actual().value
 
@@ -309,37 +312,44 @@ class StatisticsService:
     def get_restake_execution_count(self, from_date, to_date, detailing):
         return self.db_client_views.get_restake_execution_count(from_date, to_date, detailing)
 
+    @cached_by_height
     def get_restake_execution_count_actual(self):
         today = str(date.today())
         height_from = self.db_client.get_min_date_height(today).height
         return self.db_client.get_restake_execution_count_actual(height_from).value
 
-    def get_whale_transactions(self, limit, offset):
+    def get_whale_transactions(self, limit, offset, stream=False, cursor=None):
         week_ago = str(date.today() - timedelta(days=7))
         height_from = self.db_client.get_min_date_height(week_ago).height
-        whale_transactions = self.db_client.get_whale_transactions(limit, offset, height_from)
-        tx_hashes = [item.tx_hash for item in whale_transactions]
-        transactions_details = self.db_client.get_whale_transaction_details(tx_hashes)
+        return map_blocks(self.db_client.get_whale_transactions(limit, offset, height_from, stream, cursor),
+                          self.format_whale_transactions)
+
+    def format_whale_transactions(self, whale_transactions):
+        if not whale_transactions:
+            return []
+        # the message table is only read for the page's transactions and heights, streamed pages once per block
+        heights = [item.height for item in whale_transactions]
+        transactions_details = self.db_client.get_whale_transaction_details(
+            list({item.tx_hash for item in whale_transactions}), min(heights), max(heights))
+        details_by_tx_hash = {item.tx_hash: item for item in transactions_details}
         result = []
         for item in whale_transactions:
-            details = next((detail_item for detail_item in transactions_details if detail_item.tx_hash == item.tx_hash), None)
-            if details:
-                info_to_add = details._asdict()
-                info_to_add['details'] = json.loads(info_to_add['details'])
-                info_to_add['timestamp'] = str(item.timestamp)
-            else:
-                info_to_add = {
-                    'details': {},
-                    'type': '',
-                    'timestamp': str(item.timestamp)
-                }
-            result.append({**item._asdict(), **info_to_add})
+            whale_transaction = item._asdict()
+            details = details_by_tx_hash.get(item.tx_hash)
+            # transactions without a message row come with empty details
+            whale_transaction['details'] = json.loads(details.details) if details and details.details else {}
+            whale_transaction['type'] = details.type if details else ''
+            whale_transaction['timestamp'] = str(item.timestamp)
+            result.append(whale_transaction)
         return result
 
-    def get_rich_list(self, limit, offset):
-        result = self.db_client.get_rich_list(limit, offset)
+    def get_rich_list(self, limit, offset, stream=False, cursor=None):
         total_supply_amount = self.get_total_supply_actual()
-        result = [item._asdict() for item in result]
+        return map_blocks(self.db_client.get_rich_list(limit, offset, stream, cursor),
+                          lambda rich_list: self.format_rich_list(rich_list, total_supply_amount))
+
+    def format_rich_list(self, rich_list, total_supply_amount):
+        result = [item._asdict() for item in rich_list]
         for item in result:
             item['total_supply_ratio'] = item['sum'] / total_supply_amount if total_supply_amount else None
         return result
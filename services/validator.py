@@ -1,10 +1,14 @@
 import json
-from collections import namedtuple
+
+import numpy as np
 
 from clients.db_client import DBClient
 from clients.db_client_views import DBClientViews
+from common.concurrency import run_parallel
 from common.decorators import history_statistics_handler, history_statistics_handler_for_view
-from config.config import MINTSCAN_AVATAR_URL
+from common.joins import left_join
+from common.series import Series
+from config.settings import MINTSCAN_AVATAR_URL
 
 
 class ValidatorService:
@@ -19,71 +23,60 @@ class ValidatorService:
         concat_operator_self_delegate_addresses = [validator.concat_operator_self_delegate_addresses for validator in validators]
         self_delegate_addresses = [validator.self_delegate_address for validator in validators]
         consensus_addresses = [validator.consensus_address for validator in validators]
-        block_30_days_ago_height = self.db_client.get_block_30_days_ago().height
-        validators_restake_enabled = [item.address for item in self.db_client.get_validators_restake_enabled()]
         # validators_voting_power = self.db_client.get_validators_voting_power(operator_addresses)
         # validators_commission_earned = self.db_client.get_validators_commission_earned(operator_addresses)
-        validators_self_delegations = self.db_client.get_validators_self_delegations(concat_operator_self_delegate_addresses)
-        validators_votes = self.db_client.get_validators_votes(self_delegate_addresses)
-        uptime_stats = self.db_client.get_validators_uptime_stats()
-        validators_slashing = self.db_client.get_validators_slashing(consensus_addresses)
-        validators_delegators = self.db_client.get_validators_delegators_count(operator_addresses)
-        validators_new_delegators = self.db_client.get_validators_new_delegators(operator_addresses, block_30_days_ago_height)
+        results = run_parallel({
+            'restake_enabled': self.db_client.get_validators_restake_enabled,
+            'self_delegations': lambda: self.db_client.get_validators_self_delegations(concat_operator_self_delegate_addresses),
+            'votes': lambda: self.db_client.get_validators_votes(self_delegate_addresses),
+            'uptime_stats': self.db_client.get_validators_uptime_stats,
+            'slashing': lambda: self.db_client.get_validators_slashing(consensus_addresses),
+            'delegators': lambda: self.db_client.get_validators_delegators_count(operator_addresses),
+            'new_delegators': lambda: self.get_validators_new_delegators(operator_addresses),
+        })
+        validators_restake_enabled = {item.address for item in results['restake_enabled']}
         result = [validator._asdict() for validator in validators]
+        # validators without a row in a sub-result get 0 for its field
+        left_join(result, results['self_delegations'], 'concat_operator_self_delegate_addresses', {'self_delegations': 'amount'}, default=0)
+        left_join(result, results['votes'], 'self_delegate_address', {'votes': 'value'}, row_key='voter', default=0)
+        left_join(result, results['slashing'], 'consensus_address', {'slashing': 'count'}, row_key='address', default=0)
+        left_join(result, results['delegators'], 'operator_address', {'delegators': 'value'}, default=0)
+        left_join(result, results['new_delegators'], 'operator_address', {'new_delegators': 'value'}, default=0)
+        left_join(result, results['uptime_stats'], 'consensus_address', {'uptime_stat': 'value'}, row_key='validator_address', default=0)
         for validator in result:
+            del validator['concat_operator_self_delegate_addresses']
             validator['mintscan_avatar_url'] = f'{MINTSCAN_AVATAR_URL}/cosmostation/chainlist/main/chain/cosmos/moniker/{validator.get("operator_address")}.png'
-            # for index, commission_earned in enumerate(validators_commission_earned):
-            #     if commission_earned.operator_address == validator.get('operator_address'):
-            #         commission_earned = validators_commission_earned.pop(index)
-            #         validator['commission_earned'] = commission_earned.amount
-            for index, self_delegations in enumerate(validators_self_delegations):
-                if self_delegations.concat_operator_self_delegate_addresses == validator.get('concat_operator_self_delegate_addresses'):
-                    validator['self_delegations'] = self_delegations.amount
-                    del validator['concat_operator_self_delegate_addresses']
-            for index, votes in enumerate(validators_votes):
-                if votes.voter == validator.get('self_delegate_address'):
-                    validator['votes'] = votes.value
-            for index, slashing in enumerate(validators_slashing):
-                if slashing.address == validator.get('consensus_address'):
-                    validator['slashing'] = slashing.count
-            for index, delegators in enumerate(validators_delegators):
-                if delegators.operator_address == validator.get('operator_address'):
-                    validator['delegators'] = delegators.value
-            for index, new_delegators in enumerate(validators_new_delegators):
-                if new_delegators.operator_address == validator.get('operator_address'):
-                    validator['new_delegators'] = new_delegators.value
-            for index, uptime_stat in enumerate(uptime_stats):
-                if uptime_stat.validator_address == validator.get('consensus_address'):
-                    validator['uptime_stat'] = uptime_stat.value
             validator['restake_enabled'] = validator['self_delegate_address'] in validators_restake_enabled
-        for validator in result:
-            if 'slashing' not in validator:
-                validator['slashing'] = 0
-            if 'new_delegators' not in validator:
-                validator['new_delegators'] = 0
-            if 'delegators' not in validator:
-                validator['delegators'] = 0
-            if 'votes' not in validator:
-                validator['votes'] = 0
-            if 'self_delegations' not in validator:
-                validator['self_delegations'] = 0
-            if 'uptime_stat' not in validator:
-                validator['uptime_stat'] = 0
         return result
 
+    def get_validators_new_delegators(self, operator_addresses):
+        block_30_days_ago_height = self.db_client.get_block_30_days_ago().height
+        return self.db_client.get_validators_new_delegators(operator_addresses, block_30_days_ago_height)
+
     def get_validator_by_operator_address(self, operator_address):
         validator = self.db_client.get_validator_by_operator_address(operator_address)
         if not validator:
             return {}
         result = validator._asdict()
-        block_30_days_ago_height = self.db_client.get_block_30_days_ago().height
-        voting_power_and_rank = self.db_client.get_validator_voting_power_and_rank(validator.consensus_address)
-        uptime_stat = self.db_client.get_uptime_stats_by_consensus_address(validator.consensus_address)
-        self_delegations = self.db_client.get_validator_self_delegations(validator.concat_operator_self_delegate_addresses)
-        votes = self.db_client.get_validator_votes(validator.self_delegate_address)
-        slashing = self.db_client.get_validator_slashing(validator.consensus_address)
-        delegators = self.db_client.get_validator_delegators_count(validator.operator_address)
-        new_delegators = self.db_client.get_validator_new_delegators(validator.operator_address, block_30_days_ago_height)
+        # every lookup only needs the validator row, a failing one leaves its fields as None
+        results = run_parallel({
+            'voting_power_and_rank': lambda: self.db_client.get_validator_voting_power_and_rank(validator.consensus_address),
+            'uptime_stat': lambda: self.db_client.get_uptime_stats_by_consensus_address(validator.consensus_address),
+            'self_delegations': lambda: self.db_client.get_validator_self_delegations(validator.concat_operator_self_delegate_addresses),
+            'votes': lambda: self.db_client.get_validator_votes(validator.self_delegate_address),
+            'slashing': lambda: self.db_client.get_validator_slashing(validator.consensus_address),
+            'delegators': lambda: self.db_client.get_validator_delegators_count(validator.operator_address),
+            'new_delegators': lambda: self.get_validator_new_delegators(validator.operator_address),
+            'available_proposals': lambda: self.db_client.get_validator_possible_proposals(str(validator.creation_time)).value,
+            'restake_enabled': lambda: bool(self.db_client.get_validator_restake_enabled(validator.self_delegate_address)),
+        }, suppress_errors=True)
+        voting_power_and_rank = results['voting_power_and_rank']
+        self_delegations = results['self_delegations']
+        votes = results['votes']
+        slashing = results['slashing']
+        delegators = results['delegators']
+        uptime_stat = results['uptime_stat']
+        new_delegators = results['new_delegators']
         del result['concat_operator_self_delegate_addresses']
         result['voting_power'] = voting_power_and_rank.voting_power if voting_power_and_rank else None
         result['rank'] = voting_power_and_rank.rank if voting_power_and_rank else None
@@ -93,11 +86,15 @@ class ValidatorService:
         result['delegators'] = delegators.value if delegators else None
         result['uptime_stat'] = uptime_stat.value if uptime_stat else None
         result['new_delegators'] = new_delegators.value if new_delegators else None
-        result['available_proposals'] = self.db_client.get_validator_possible_proposals(str(validator.creation_time)).value
+        result['available_proposals'] = results['available_proposals']
         result['mintscan_avatar_url'] = f'{MINTSCAN_AVATAR_URL}/cosmostation/chainlist/main/chain/cosmos/moniker/{result.get("operator_address")}.png'
-        result['restake_enabled'] = bool(self.db_client.get_validator_restake_enabled(validator.self_delegate_address))
+        result['restake_enabled'] = results['restake_enabled']
         return result
 
+    def get_validator_new_delegators(self, operator_address):
+        block_30_days_ago_height = self.db_client.get_block_30_days_ago().height
+        return self.db_client.get_validator_new_delegators(operator_address, block_30_days_ago_height)
+
     @history_statistics_handler
     def get_validator_commissions(self, from_date, to_date, detailing, operator_address, height_from=None, height_to=None):
         return self.db_client.get_validator_commissions(from_date, to_date, detailing, operator_address, height_from, height_to)
@@ -143,11 +140,8 @@ class ValidatorService:
         consensus_address = self.db_client.get_validator(operator_address).consensus_address
         validator_commits = self.db_client.get_validator_historical_uptime_stat(from_date, to_date, detailing, consensus_address, height_from, height_to)
         total_blocks = self.db_client.get_total_count_of_blocks_for_historical_uptime_stat(from_date, to_date, detailing, height_from, height_to)
-        result = []
-        Record = namedtuple('Record', ['x', 'y'])
-        for i in range(len(validator_commits)):
-            result.append(Record(validator_commits[i].x, validator_commits[i].y / total_blocks[i].y))
-        return result
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return Series(validator_commits.x, validator_commits.y / total_blocks.y[:len(validator_commits)])
 
     def get_validators_group_map(self):
         result = self.db_client.get_validators_group_map()
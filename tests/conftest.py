@@ -0,0 +1,28 @@
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# config/config.py belongs to the deployment, the tests only need the settings without defaults
+# (see config/defaults.py) and never reach ClickHouse or the HTTP APIs
+TEST_SETTINGS = {
+    'API_HOST': '127.0.0.1',
+    'API_PORT': 5002,
+    'NETWORK': 'cosmos',
+    'STAKED_DENOM': 'uatom',
+    'MINTSCAN_AVATAR_URL': 'http://127.0.0.1:1/',
+    'CLICKHOUSE_HOST': '127.0.0.1',
+    'CLICKHOUSE_PORT': 8123,
+    'CLICKHOUSE_USERNAME': 'default',
+    'CLICKHOUSE_PASSWORD': '',
+    'LCD_API': 'http://127.0.0.1:1/',
+    'PRICE_FEED_API': 'http://127.0.0.1:1/',
+}
+
+try:
+    import config.config  # noqa: F401
+except ImportError:
+    test_config = types.ModuleType('config.config')
+    test_config.__dict__.update(TEST_SETTINGS)
+    sys.modules['config.config'] = test_config
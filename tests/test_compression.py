@@ -0,0 +1,89 @@
+import gzip
+import zlib
+
+import pytest
+from flask import Response
+from werkzeug.http import parse_accept_header
+
+from common import compression
+from common.compression import COMPRESSORS, CONTINUABLE_ENCODINGS, compress_prefix, compress_response, continue_prefix
+from common.serialization import PayloadResponse, add_fields
+
+PAYLOAD = {'data': [{'height': index, 'address': f'cosmos1{index:038d}'} for index in range(300)]}
+ENCODINGS = sorted(CONTINUABLE_ENCODINGS & set(COMPRESSORS))
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'gzip':
+        # a single member with a valid trailer, not only something gzip.decompress accepts
+        decompressor = zlib.decompressobj(31)
+        result = decompressor.decompress(data)
+        assert decompressor.eof and not decompressor.unused_data
+        return result
+    return compression.zstd.decompress(data)
+
+
+def payload_response(response_time: int, repeats: bool) -> PayloadResponse:
+    response = PayloadResponse(PAYLOAD, mimetype='application/json')
+    response.payload_repeats = repeats
+    body = response.encode()
+    response.set_data(add_fields(body, {'network': 'cosmos', 'response_time': response_time}))
+    return response
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    compression.COMPRESSED_BODIES.entries.clear()
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+@pytest.mark.parametrize('prefix, rest', [(b'{"a":1', b',"b":2}'), (b'', b'{}'), (b'x' * 100000, b'')])
+def test_prefix_continuation_round_trip(encoding, prefix, rest):
+    assert decompress(continue_prefix(compress_prefix(prefix, encoding), rest, encoding), encoding) == prefix + rest
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_repeating_payload_is_compressed_once(encoding):
+    for response_time in (5, 123456):
+        response = payload_response(response_time, repeats=True)
+        expected = response.get_data()
+        compress_response(response, parse_accept_header(encoding))
+        assert response.content_encoding == encoding
+        assert decompress(response.get_data(), encoding) == expected
+    entries = list(compression.COMPRESSED_BODIES.entries.values())
+    assert len(entries) == 1
+    # plain bytes, no compressor state is kept
+    compressed, crc, size = entries[0][0]
+    assert isinstance(compressed, bytes)
+
+
+def test_unique_payload_is_not_cached():
+    response = payload_response(5, repeats=False)
+    expected = response.get_data()
+    compress_response(response, parse_accept_header('gzip'))
+    assert gzip.decompress(response.get_data()) == expected
+    assert len(compression.COMPRESSED_BODIES) == 0
+
+
+def test_client_preference_wins():
+    response = payload_response(5, repeats=True)
+    compress_response(response, parse_accept_header('gzip;q=0.5, zstd;q=0.1, br;q=0.1'))
+    assert response.content_encoding == 'gzip'
+    assert compression.negotiate_encoding(parse_accept_header(', '.join(COMPRESSORS))) == list(COMPRESSORS)[0]
+
+
+def test_small_and_unaccepted_bodies_stay_as_they_are():
+    small = Response(b'{}', mimetype='application/json')
+    compress_response(small, parse_accept_header('gzip'))
+    assert small.content_encoding is None and small.get_data() == b'{}'
+    identity = payload_response(5, repeats=False)
+    compress_response(identity, parse_accept_header('identity'))
+    assert identity.content_encoding is None
+    assert 'Accept-Encoding' in identity.vary
+
+
+def test_strong_etag_becomes_weak_when_encoded():
+    response = Response(b'a' * 5000, mimetype='text/javascript')
+    response.set_etag('abc')
+    compress_response(response, parse_accept_header('gzip'))
+    assert response.get_etag() == ('abc', True)
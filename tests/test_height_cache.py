@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytest
+from flask import Flask, jsonify
+
+from common import height_cache
+from common.height_cache import HeightCache, conditional_on_height
+from config.settings import NETWORK
+
+
+class FakeProbe:
+    height = 100
+
+    def get_height(self):
+        return self.height
+
+
+@pytest.fixture
+def head(monkeypatch):
+    state = {'height': 100}
+    monkeypatch.setattr(height_cache.head_height_probe, 'get_head',
+                        lambda: (state['height'], datetime(2024, 1, 1, 12, 0)))
+    return state
+
+
+@pytest.fixture
+def client(head):
+    app = Flask(__name__)
+    app.calls = 0
+
+    @app.route('/actual')
+    @conditional_on_height
+    def actual():
+        app.calls += 1
+        return jsonify({'data': 1})
+
+    return app.test_client()
+
+
+def test_response_is_tagged_with_the_head_height(client):
+    response = client.get('/actual')
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'W/"{NETWORK}-100"'
+    assert response.headers['Last-Modified'] == 'Mon, 01 Jan 2024 12:00:00 GMT'
+    assert response.cache_control.no_cache
+
+
+def test_current_tag_gets_304_without_running_the_view(client):
+    etag = client.get('/actual').headers['ETag']
+    response = client.get('/actual', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert client.application.calls == 1
+
+
+def test_new_block_invalidates_the_tag(client, head):
+    etag = client.get('/actual').headers['ETag']
+    head['height'] = 101
+    response = client.get('/actual', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'W/"{NETWORK}-101"'
+
+
+def test_height_cache_recomputes_on_a_new_block():
+    probe = FakeProbe()
+    cache = HeightCache(probe)
+    values = iter(range(10))
+    assert cache.get_or_compute('key', lambda: next(values)) == 0
+    assert cache.get_or_compute('key', lambda: next(values)) == 0
+    probe.height = 101
+    assert cache.get_or_compute('key', lambda: next(values)) == 1
+    assert (cache.hits, cache.misses) == (1, 2)
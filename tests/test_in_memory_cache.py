@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from common import in_memory_cache
+from common.in_memory_cache import BoundedCache, load_snapshot, save_snapshot
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = BoundedCache(10, ttl=60)
+    cache.set('default', 1)
+    cache.set('short', 2, ttl=5)
+    clock[0] += 10
+    assert 'short' not in cache
+    assert cache.get('default') == 1
+    clock[0] += 60
+    assert cache.get('default') is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = BoundedCache(2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert 'b' not in cache
+    assert cache['a'] == 1 and cache['c'] == 3
+    with pytest.raises(KeyError):
+        cache['b']
+
+
+def test_snapshot_round_trip(tmp_path, clock, monkeypatch):
+    symbols, logos = BoundedCache(10, ttl=100), BoundedCache(10, ttl=100)
+    monkeypatch.setattr(in_memory_cache, 'SNAPSHOT_CACHES', {'symbols': symbols, 'logos': logos})
+    symbols.set('ibc/A', 'atom')
+    symbols.set('ibc/B', None, ttl=5)
+    logos.set('atom', 'https://logo')
+    path = str(tmp_path / 'assets.json')
+    save_snapshot(path)
+    assert list(tmp_path.iterdir()) == [tmp_path / 'assets.json']
+
+    restored_symbols, restored_logos = BoundedCache(10), BoundedCache(10)
+    monkeypatch.setattr(in_memory_cache, 'SNAPSHOT_CACHES', {'symbols': restored_symbols, 'logos': restored_logos})
+    clock[0] += 10
+    load_snapshot(path)
+    assert restored_symbols.get('ibc/A') == 'atom'
+    # expired while the process was down
+    assert 'ibc/B' not in restored_symbols
+    assert restored_logos.get('atom') == 'https://logo'
+    clock[0] += 100
+    # the snapshot keeps the original expiry
+    assert restored_symbols.get('ibc/A') is None
+
+
+def test_missing_or_broken_snapshot_is_ignored(tmp_path, monkeypatch):
+    cache = BoundedCache(10)
+    monkeypatch.setattr(in_memory_cache, 'SNAPSHOT_CACHES', {'symbols': cache})
+    load_snapshot(str(tmp_path / 'missing.json'))
+    broken = tmp_path / 'broken.json'
+    broken.write_text('{')
+    load_snapshot(str(broken))
+    assert len(cache) == 0
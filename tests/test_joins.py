@@ -0,0 +1,30 @@
+from collections import namedtuple
+
+from common.joins import group_by, index_by, left_join
+
+Row = namedtuple('Row', ['address', 'denom', 'amount'])
+ROWS = [Row('a', 'uatom', 1), Row('b', 'uatom', 2), Row('a', 'uosmo', 3)]
+
+
+def test_index_by_keeps_the_last_row():
+    assert index_by(ROWS, 'address')['a'].amount == 3
+
+
+def test_index_by_first():
+    assert index_by(ROWS, 'address', first=True)['a'].amount == 1
+
+
+def test_index_by_several_attributes():
+    assert index_by(ROWS, ('address', 'denom'))[('a', 'uosmo')].amount == 3
+
+
+def test_group_by_keeps_query_order():
+    groups = group_by(ROWS, 'address')
+    assert [row.amount for row in groups['a']] == [1, 3]
+    assert [row.amount for row in groups['b']] == [2]
+
+
+def test_left_join_sets_default_without_a_match():
+    items = [{'owner': 'b'}, {'owner': 'c'}]
+    left_join(items, ROWS, on='owner', row_key='address', fields={'amount': 'amount'}, default=0)
+    assert items == [{'owner': 'b', 'amount': 2}, {'owner': 'c', 'amount': 0}]
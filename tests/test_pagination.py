@@ -0,0 +1,57 @@
+import base64
+import json
+
+import pytest
+from werkzeug.exceptions import BadRequest
+
+from common.pagination import Keyset, encode_cursor, next_cursor, sql_literal
+
+KEYSET = Keyset(('height', 'DESC'), ('tx_hash', 'ASC'))
+
+
+def raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+def test_cursor_round_trip():
+    values = [123, "ab'c", 2 ** 100]
+    assert Keyset(('a', 'ASC'), ('b', 'ASC'), ('c', 'ASC')).decode(encode_cursor(values)) == values
+
+
+def test_next_cursor_uses_the_last_item():
+    items = [{'height': 2, 'tx_hash': 'b'}, {'height': 1, 'tx_hash': 'a'}]
+    assert KEYSET.decode(next_cursor(items, ('height', 'tx_hash'))) == [1, 'a']
+    assert next_cursor([], ('height', 'tx_hash')) is None
+
+
+def test_no_cursor():
+    assert KEYSET.decode(None) is None
+    assert KEYSET.decode('') is None
+    assert KEYSET.filter(None, 'WHERE') == ''
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    raw_cursor('{"height": 1}')[:-3],
+    raw_cursor({'height': 1, 'tx_hash': 'a'}),
+    raw_cursor([1]),
+    raw_cursor([1, 'a', 2]),
+    raw_cursor([True, 'a']),
+    raw_cursor([1.5, 'a']),
+    raw_cursor([None, 'a']),
+    raw_cursor([[1], 'a']),
+])
+def test_tampered_cursor_is_a_bad_request(cursor):
+    with pytest.raises(BadRequest):
+        KEYSET.decode(cursor)
+
+
+def test_condition_follows_the_order():
+    assert KEYSET.filter([10, 'ab'], 'WHERE') == "WHERE (height < 10 OR (height = 10 AND (tx_hash > 'ab')))"
+    assert KEYSET.order_by() == 'height DESC, tx_hash ASC'
+
+
+def test_sql_literal_escapes_strings():
+    assert sql_literal("a'b\\") == "'a\\'b\\\\'"
+    assert sql_literal(5) == '5'
+    assert sql_literal(2 ** 64) == f"toUInt256('{2 ** 64}')"